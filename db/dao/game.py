@@ -1,118 +1,293 @@
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import select, update, and_, or_, case, func, text
+from sqlalchemy.dialects.postgresql import insert
+
 from db.dao.base import BaseDAO
-from db.models import GameDate
+from db.models import GameDate, GameState
 from messages.messages import send_game_message_date_change
-from logging_config import parser_logger
-from parser.utils import download_image
+from logging_config import bot_logger, parser_logger
+
+
+# Строк в одном INSERT ... ON CONFLICT: 13 столбцов × 500 укладывается в лимит параметров asyncpg
+UPSERT_CHUNK_SIZE = 500
+# Перенос старта на столько дней и больше сбрасывает флаги анонса
+RESCHEDULE_RESET_DAYS = 5
+
+# Игра с изменившимися датами; для неизменной даты old/new равны None
+DateChange = namedtuple("DateChange", ["game", "old_start_date", "new_start_date", "old_end_date", "new_end_date"])
+
+
+# Кэш строк game_dates для GameDateDAO.get(id=...): сколько игр держать и сколько секунд
+# доверять строке, если инвалидация по какой-то причине не пришла
+GAME_CACHE_SIZE = 1024
+GAME_CACHE_TTL = 300
+
+
+class GameRowCache:
+    """
+    LRU-кэш строк game_dates по id с TTL.
+
+    Строки меняет только парсер и пересчет состояний; они явно сбрасывают затронутые
+    id (invalidate). Чтобы чтение, начавшееся до записи, не положило в кэш старую
+    строку, put принимает поколение, взятое до чтения, и игнорирует устаревшие.
+    """
+
+    def __init__(self, maxsize: int = GAME_CACHE_SIZE, ttl: float = GAME_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._rows: "OrderedDict[int, tuple]" = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, game_id: int) -> Optional[GameDate]:
+        entry = self._rows.get(game_id)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self._rows.pop(game_id, None)
+            self.misses += 1
+            return None
+        self._rows.move_to_end(game_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, game_id: int, row: GameDate, generation: int) -> None:
+        if generation != self.generation:
+            return
+        self._rows[game_id] = (time.monotonic(), row)
+        self._rows.move_to_end(game_id)
+        while len(self._rows) > self.maxsize:
+            self._rows.popitem(last=False)
+
+    def invalidate(self, game_ids: Optional[Iterable[int]] = None) -> None:
+        """Сбрасывает строки игр; без аргумента — весь кэш."""
+        self.generation += 1
+        self.invalidations += 1
+        if game_ids is None:
+            self._rows.clear()
+            return
+        for game_id in game_ids:
+            self._rows.pop(game_id, None)
+
+    def log_stats(self) -> None:
+        requests = self.hits + self.misses
+        hit_rate = self.hits / requests * 100 if requests else 0.0
+        bot_logger.info(
+            f"Кэш игр: попаданий={self.hits}, промахов={self.misses} ({hit_rate:.1f}% попаданий), "
+            f"сбросов={self.invalidations}, в кэше={len(self._rows)}/{self.maxsize}"
+        )
+
+
+# Общий для всех экземпляров GameDateDAO: loader и db.utils создают свои
+game_row_cache = GameRowCache()
 
 
 class GameDateDAO(BaseDAO):
     __model__ = GameDate
 
-    async def create(self, **kwargs):
+    async def get(self, **kwargs):
+        """get(id=...) читается через game_row_cache; остальные фильтры — как в BaseDAO."""
+        if set(kwargs) != {"id"}:
+            return await super().get(**kwargs)
+
+        game_id = kwargs["id"]
+        game = game_row_cache.get(game_id)
+        if game is not None:
+            return game
+        generation = game_row_cache.generation
+        game = await super().get(id=game_id)
+        if game is not None:
+            game_row_cache.put(game_id, game, generation)
+        return game
+
+    @staticmethod
+    def invalidate_cache(game_ids: Optional[Iterable[int]] = None) -> None:
+        """Сбрасывает кэш строк после записи в game_dates в обход методов DAO."""
+        game_row_cache.invalidate(game_ids)
+
+    async def update(self, **kwargs):
+        await super().update(**kwargs)
+        game_row_cache.invalidate([kwargs["id"]] if "id" in kwargs else None)
+
+    async def delete(self, **kwargs):
+        await super().delete(**kwargs)
+        game_row_cache.invalidate([kwargs["id"]] if "id" in kwargs else None)
+
+    async def get_for_snapshot(self, ids, states):
+        """Возвращает одним запросом игры с заданными id и все игры в заданных состояниях."""
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(self.__model__).where(or_(self.__model__.id.in_(ids), self.__model__.state.in_(states)))
+            )
+            return result.scalars().all()
+
+    async def update_states(self, now: datetime, restore_ids: Iterable[int] = ()):
+        """
+        Пересчитывает состояние живых (UPCOMING/ACTIVE) игр по датам одним UPDATE ... RETURNING.
+
+        До start_date — UPCOMING, после start_date и до end_date (или без end_date) — ACTIVE,
+        иначе COMPLETED. Завершенные игры не трогаются, архивные — только из restore_ids.
+
+        :param now: Текущее время (московское, без tzinfo).
+        :param restore_ids: Архивные игры, которые снова появились в календаре: пересчитываются
+            вместе с живыми.
+        :return: Строки (id, old_state, state, start_date, end_date, domain) изменившихся игр.
+        """
+        model = self.__model__
+        live_states = (GameState.UPCOMING.value, GameState.ACTIVE.value)
+        new_state = case(
+            (model.start_date > now, GameState.UPCOMING.value),
+            (or_(model.end_date.is_(None), model.end_date > now), GameState.ACTIVE.value),
+            else_=GameState.COMPLETED.value,
+        )
+        # RETURNING отдает уже новые значения, поэтому старое состояние берем из подзапроса
+        restore_ids = list(restore_ids)
+        selected = model.state.in_(live_states)
+        if restore_ids:
+            selected = or_(selected, and_(model.state == GameState.ARCHIVED.value, model.id.in_(restore_ids)))
+        old = select(model.id, model.state.label("old_state")).where(selected).subquery("old")
+
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(model)
+                .where(model.id == old.c.id, model.state != new_state)
+                .values(state=new_state)
+                .returning(model.id, old.c.old_state, model.state, model.start_date, model.end_date, model.domain)
+            )
+            rows = result.all()
+            await session.commit()
+        game_row_cache.invalidate(row.id for row in rows)
+        return rows
+
+    @staticmethod
+    async def _send_date_change_message(instance, old_start_date, new_start_date, old_end_date, new_end_date):
+        """Отправляет в чаты сообщение о переносе, если анонс игры уже был."""
         from loader import bot
+        start_date_updated = new_start_date is not None
+        end_date_updated = new_end_date is not None
+
+        if instance.is_announcement_sent:
+            if start_date_updated and end_date_updated:
+                await send_game_message_date_change(
+                    bot=bot,
+                    game=instance,
+                    message_type="both_reschedule",
+                    new_start_date=new_start_date,
+                    old_start_date=old_start_date,
+                    new_end_date=new_end_date,
+                    old_end_date=old_end_date,
+                )
+            elif start_date_updated:
+                await send_game_message_date_change(
+                    bot=bot,
+                    game=instance,
+                    message_type="reschedule_start",
+                    new_start_date=new_start_date,
+                    old_start_date=old_start_date,
+                )
+            elif end_date_updated:
+                await send_game_message_date_change(
+                    bot=bot,
+                    game=instance,
+                    message_type="reschedule_end",
+                    new_end_date=new_end_date,
+                    old_end_date=old_end_date,
+                )
+
+    async def bulk_upsert(self, rows: List[dict]) -> List[DateChange]:
+        """
+        Создает/обновляет игры пачками через INSERT ... ON CONFLICT DO UPDATE ... RETURNING.
+
+        Дата окончания не затирается пустой, перенос старта
+        на RESCHEDULE_RESET_DAYS и больше сбрасывает флаги анонса, локальная обложка
+        заменяется только при смене image_url, состояние существующей игры не меняется.
+        Все пачки пишутся в одной транзакции; после коммита для игр с изменившимися
+        датами сбрасываются флаги подписчиков и отправляются сообщения о переносе.
+
+        :param rows: Словари со столбцами game_dates; image — уже скачанная локальная обложка.
+        :return: Список DateChange для игр, у которых изменились даты.
+        """
+        if not rows:
+            return []
+
+        model = self.__model__
+        changes = []
         async with self.session_factory() as session:
-            existing_instance = await session.get(self.__model__, kwargs.get('id'))
-
-            if existing_instance:
-                new_end_date = kwargs.get('end_date')
-                new_start_date = kwargs.get('start_date')
-                old_end_date = existing_instance.end_date
-                old_start_date = existing_instance.start_date
-
-                start_date_updated = new_start_date and new_start_date != old_start_date
-                end_date_updated = new_end_date and new_end_date != old_end_date
-
-                if start_date_updated and (new_start_date - old_start_date).days >= 5:
-                    existing_instance.is_announcement_sent = False
-                    existing_instance.is_start_message_sent = False
-
-                if start_date_updated:
-                    existing_instance.start_date = new_start_date
-                if end_date_updated:
-                    existing_instance.end_date = new_end_date
-
-                for key, value in kwargs.items():
-                    if hasattr(existing_instance, key) and key not in ('id', 'start_date', 'end_date'):
-                        if key == "image" and isinstance(value, str) and value.startswith("http"):
-                            # Сравниваем с оригинальным URL, а не с локальным путём
-                            current_image_url = getattr(existing_instance, 'image_url', None)
-                            if current_image_url != value:
-                                download_result = await download_image(value, game_id=existing_instance.id)
-
-                                if download_result is not None:
-                                    # Сохраняем локальный путь в image и оригинальный URL в image_url
-                                    existing_instance.image = download_result
-                                    existing_instance.image_url = value
-                                    parser_logger.info(f"Изображение изменено для : {kwargs.get('id')}")
-                                    parser_logger.info(f"  Старый URL: {current_image_url}")
-                                    parser_logger.info(f"  Новый URL: {value}")
-                                else:
-                                    existing_instance.image = None
-                                    existing_instance.image_url = value
-                                    parser_logger.info(
-                                        f"❌ Изображение не было загружено, ставим None для : {kwargs.get('id')}")
-                        else:
-                            setattr(existing_instance, key, value)
-
-                session.add(existing_instance)
-                if start_date_updated or end_date_updated:
-                    parser_logger.info(f"Объект обновлен: {kwargs.get('id')}")
-
-                    # Сбрасываем флаги уведомлений подписчиков при изменении дат
-                    from db.dao.subs import UserGameSubscriptionDAO
-                    subs_dao = UserGameSubscriptionDAO(self.session_factory)
-                    await subs_dao.reset_notification_flags_for_game(existing_instance.id)
-                    parser_logger.info(
-                        f"🔄 Сброшены флаги уведомлений подписчиков для игры {existing_instance.id} "
-                        f"из-за изменения дат"
-                    )
-
-                    if existing_instance.is_announcement_sent:
-                        if start_date_updated and end_date_updated:
-                            await send_game_message_date_change(
-                                bot=bot,
-                                game=existing_instance,
-                                message_type="both_reschedule",
-                                new_start_date=new_start_date,
-                                old_start_date=old_start_date,
-                                new_end_date=new_end_date,
-                                old_end_date=old_end_date,
-                            )
-                        elif start_date_updated:
-                            await send_game_message_date_change(
-                                bot=bot,
-                                game=existing_instance,
-                                message_type="reschedule_start",
-                                new_start_date=new_start_date,
-                                old_start_date=old_start_date,
-                            )
-                        elif end_date_updated:
-                            await send_game_message_date_change(
-                                bot=bot,
-                                game=existing_instance,
-                                message_type="reschedule_end",
-                                new_end_date=new_end_date,
-                                old_end_date=old_end_date,
-                            )
-                        # existing_instance.is_announcement_sent = False
-                        # existing_instance.is_start_message = False
-
-                await session.commit()
-
-            else:
-                # Сохраняем оригинальный URL изображения
-                original_image_url = kwargs.get('image')
-                instance = self.__model__(**kwargs)
-                session.add(instance)
-                parser_logger.info(f"Создан новый объект: {kwargs.get('id')}")
-
-                # Скачиваем изображение, если URL предоставлен
-                if original_image_url and isinstance(original_image_url, str) and original_image_url.startswith("http"):
-                    download_result = await download_image(image_url=original_image_url, game_id=instance.id)
-                    if download_result is None:
-                        parser_logger.info(f"❌ Не удалось загрузить изображение для {kwargs.get('id')}. Устанавливаем None.")
-                        instance.image = None
-                    else:
-                        instance.image = download_result
-                    instance.image_url = original_image_url
-                await session.commit()
+            for offset in range(0, len(rows), UPSERT_CHUNK_SIZE):
+                chunk = rows[offset:offset + UPSERT_CHUNK_SIZE]
+
+                # Старые даты нужны для сравнения: RETURNING отдает только новые значения
+                old_rows = await session.execute(
+                    select(model.id, model.start_date, model.end_date)
+                    .where(model.id.in_([row["id"] for row in chunk]))
+                    .with_for_update()
+                )
+                old_dates = {game_id: (start_date, end_date) for game_id, start_date, end_date in old_rows}
+
+                stmt = insert(model).values(chunk)
+                rescheduled = stmt.excluded.start_date - model.start_date >= text(
+                    f"interval '{RESCHEDULE_RESET_DAYS} days'"
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[model.id],
+                    set_={
+                        "domain": stmt.excluded.domain,
+                        "name": stmt.excluded.name,
+                        "author": stmt.excluded.author,
+                        "price": stmt.excluded.price,
+                        "link": stmt.excluded.link,
+                        "game_type": stmt.excluded.game_type,
+                        "max_players": stmt.excluded.max_players,
+                        "start_date": stmt.excluded.start_date,
+                        "end_date": func.coalesce(stmt.excluded.end_date, model.end_date),
+                        "image": case(
+                            (stmt.excluded.image_url.is_distinct_from(model.image_url), stmt.excluded.image),
+                            else_=model.image,
+                        ),
+                        "image_url": stmt.excluded.image_url,
+                        "is_announcement_sent": case((rescheduled, False), else_=model.is_announcement_sent),
+                        "is_start_message_sent": case((rescheduled, False), else_=model.is_start_message_sent),
+                    },
+                ).returning(model)
+
+                result = await session.scalars(stmt, execution_options={"populate_existing": True})
+                for game in result:
+                    if game.id not in old_dates:
+                        continue
+                    old_start_date, old_end_date = old_dates[game.id]
+                    start_date_updated = game.start_date != old_start_date
+                    end_date_updated = game.end_date != old_end_date
+                    if start_date_updated or end_date_updated:
+                        changes.append(DateChange(
+                            game=game,
+                            old_start_date=old_start_date if start_date_updated else None,
+                            new_start_date=game.start_date if start_date_updated else None,
+                            old_end_date=old_end_date if end_date_updated else None,
+                            new_end_date=game.end_date if end_date_updated else None,
+                        ))
+
+            await session.commit()
+        game_row_cache.invalidate(row["id"] for row in rows)
+
+        parser_logger.info(
+            f"Массовое обновление игр: записано {len(rows)} строк, изменились даты у {len(changes)} игр"
+        )
+        if changes:
+            from db.dao.subs import UserGameSubscriptionDAO
+            await UserGameSubscriptionDAO(self.session_factory).reset_notification_flags_for_games(
+                [change.game.id for change in changes]
+            )
+            for change in changes:
+                parser_logger.info(
+                    f"Объект обновлен: {change.game.id}; сброшены флаги уведомлений подписчиков "
+                    f"из-за изменения дат"
+                )
+                await self._send_date_change_message(
+                    change.game, change.old_start_date, change.new_start_date,
+                    change.old_end_date, change.new_end_date,
+                )
+        return changes
@@ -1,49 +1,81 @@
-from sqlalchemy import select, update
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, update, delete, exists, func, literal, literal_column, String
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
 
 from db.dao.base import BaseDAO
 from db.models import UserGameSubscription, UserGameRole, User, GameDate
 
+USER_NOT_FOUND_MESSAGE = "Ошибка: Пользователь не найден."
 
-class UserGameSubscriptionDAO(BaseDAO):
-    __model__ = UserGameSubscription
-
-    async def add_user_to_subscription(self, user_id: int, game_id: int):
-        async with self.session_factory() as session:
-            existing_user = await session.execute(
-                select(User).filter_by(telegram_id=user_id)
-            )
-            user = existing_user.scalars().first()
 
-            existing_game = await session.execute(
-                select(GameDate).filter_by(id=game_id)
-            )
-            game = existing_game.scalars().first()
+async def _find_missing(session, user_id: int, game_id: int) -> Tuple[bool, bool]:
+    """
+    Почему запрос-мутация ничего не изменил: (нет пользователя, нет игры).
+    Выполняется только на этом редком пути, чтобы вернуть прежний текст ошибки.
+    """
+    row = (await session.execute(select(
+        ~exists().where(User.telegram_id == user_id),
+        ~exists().where(GameDate.id == game_id),
+    ))).one()
+    return row[0], row[1]
 
-            if not game:
-                return f"Упс {game_id} уже не существует."
 
-            existing_subscription = await self.get(user_id=user.id, game_id=game_id)
+class UserGameSubscriptionDAO(BaseDAO):
+    __model__ = UserGameSubscription
 
-            if existing_subscription:
-                return f"Вы уже подписаны на игру {game_id}."
+    async def add_user_to_subscription(self, user_id: int, game_id: int):
+        """
+        Подписывает пользователя на игру одним INSERT ... SELECT ... ON CONFLICT ... RETURNING.
 
-            await self.create(user_id=user.id, game_id=game_id)
-            return f"Вы успешно подписались на игру {game_id}."
+        :param user_id: Telegram id пользователя (users.id ищется в том же запросе).
+        :param game_id: id игры.
+        :return: Текст ответа пользователю.
+        """
+        async with self.session_factory() as session:
+            target = select(User.id, GameDate.id).where(User.telegram_id == user_id, GameDate.id == game_id)
+            stmt = insert(UserGameSubscription).from_select(["user_id", "game_id"], target)
+            # Пустое обновление нужно, чтобы RETURNING вернул строку и для уже существующей подписки;
+            # xmax = 0 только у только что вставленной строки
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserGameSubscription.user_id, UserGameSubscription.game_id],
+                set_={"user_id": stmt.excluded.user_id},
+            ).returning(literal_column("xmax = 0").label("inserted"))
+            inserted = (await session.execute(stmt)).scalar()
+            await session.commit()
+            if inserted is None:
+                user_missing, game_missing = await _find_missing(session, user_id, game_id)
+
+        if inserted is None:
+            # Как и раньше, об отсутствующей игре сообщаем раньше, чем об отсутствующем пользователе
+            if user_missing and not game_missing:
+                return USER_NOT_FOUND_MESSAGE
+            return f"Упс {game_id} уже не существует."
+        if not inserted:
+            return f"Вы уже подписаны на игру {game_id}."
+        return f"Вы успешно подписались на игру {game_id}."
 
     async def remove_user_from_subscription(self, user_id: int, game_id: int):
-        """Удаляет подписку пользователя на игру"""
+        """Удаляет подписку пользователя на игру одним DELETE ... USING users ... RETURNING"""
         async with self.session_factory() as session:
-            existing_user = await session.execute(
-                select(User).filter_by(telegram_id=user_id)
+            result = await session.execute(
+                delete(UserGameSubscription)
+                .where(
+                    UserGameSubscription.user_id == User.id,
+                    User.telegram_id == user_id,
+                    UserGameSubscription.game_id == game_id,
+                )
+                .returning(UserGameSubscription.game_id)
             )
-            user = existing_user.scalars().first()
-
-            existing_subscription = await self.get(user_id=user.id, game_id=game_id)
-            if not existing_subscription:
-                return f"Вы не подписаны на игру {game_id}."
+            deleted = result.scalar()
+            await session.commit()
+            if deleted is None:
+                user_missing, _ = await _find_missing(session, user_id, game_id)
 
-            await self.delete(user_id=user.id, game_id=game_id)
-            return f"Вы успешно отписались от игры {game_id}."
+        if deleted is None:
+            return USER_NOT_FOUND_MESSAGE if user_missing else f"Вы не подписаны на игру {game_id}."
+        return f"Вы успешно отписались от игры {game_id}."
 
     async def is_user_subscribed(self, user_id: int, game_id: int) -> bool:
         """Проверяет, подписан ли пользователь на игру"""
@@ -121,37 +153,145 @@ class UserGameSubscriptionDAO(BaseDAO):
             await session.execute(stmt)
             await session.commit()
 
+    async def reset_notification_flags_for_games(self, game_ids: List[int]) -> None:
+        """Сбрасывает флаги уведомлений для всех подписчиков нескольких игр одним запросом"""
+        if not game_ids:
+            return
+        async with self.session_factory() as session:
+            stmt = update(UserGameSubscription).where(
+                UserGameSubscription.game_id.in_(game_ids)
+            ).values({
+                "is_equator_notified": False,
+                "is_2days_before_end_notified": False,
+                "is_game_started_notified": False
+            })
+            await session.execute(stmt)
+            await session.commit()
+
+
+class RoleCountCache:
+    """
+    Число пользователей с каждой ролью по играм для клавиатуры поиска команды.
+
+    Заполняется одним GROUP BY при первом обращении к игре, дальше обновляется
+    при добавлении/смене/удалении роли через UserGameRoleDAO; при завершении игры
+    (роли удаляются) запись сбрасывается.
+    """
+
+    def __init__(self):
+        self._counts: Dict[int, Dict[str, int]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, game_id: int) -> Optional[Dict[str, int]]:
+        counts = self._counts.get(game_id)
+        if counts is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(counts)
+
+    def set(self, game_id: int, counts: Dict[str, int]) -> None:
+        self._counts[game_id] = dict(counts)
+
+    def apply(self, game_id: int, old_role: Optional[str], new_role: Optional[str]) -> None:
+        """Учитывает смену роли одного пользователя: None — роли не было / больше нет."""
+        counts = self._counts.get(game_id)
+        if counts is None or old_role == new_role:
+            return
+        if old_role is not None:
+            counts[old_role] = max(0, counts.get(old_role, 0) - 1)
+        if new_role is not None:
+            counts[new_role] = counts.get(new_role, 0) + 1
+
+    def invalidate(self, game_ids: Iterable[int]) -> None:
+        for game_id in game_ids:
+            self._counts.pop(game_id, None)
+
+
+role_count_cache = RoleCountCache()
+
 
 class UserGameRoleDAO(BaseDAO):
     __model__ = UserGameRole
 
     async def add_user_role(self, user_id: int, game_id: int, role: str):
-        """Добавляет или обновляет роль пользователя в игре"""
+        """
+        Добавляет или обновляет роль пользователя в игре одним INSERT ... SELECT ... ON CONFLICT ... RETURNING.
+
+        :param user_id: Telegram id пользователя (users.id ищется в том же запросе).
+        :param game_id: id игры.
+        :param role: Роль в поиске команды.
+        :return: None при успехе или текст ошибки, если пользователя или игры нет.
+        """
         async with self.session_factory() as session:
-            existing_user = await session.execute(
-                select(User).filter_by(telegram_id=user_id)
+            target = select(User.id, GameDate.id, literal(role, String)).where(
+                User.telegram_id == user_id, GameDate.id == game_id
             )
-            user = existing_user.scalars().first()
+            # Подзапрос в RETURNING не видит изменений самого INSERT и отдает прежнюю роль (или NULL)
+            previous = aliased(UserGameRole)
+            old_role = (
+                select(previous.role)
+                .join(User, User.id == previous.user_id)
+                .where(User.telegram_id == user_id, previous.game_id == game_id)
+                .scalar_subquery()
+            )
+            stmt = insert(UserGameRole).from_select(["user_id", "game_id", "role"], target)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserGameRole.user_id, UserGameRole.game_id],
+                set_={"role": stmt.excluded.role},
+            ).returning(UserGameRole.game_id, old_role.label("old_role"))
+            saved = (await session.execute(stmt)).first()
+            await session.commit()
+            if saved is None:
+                user_missing, _ = await _find_missing(session, user_id, game_id)
 
-            if not user:
-                return "Ошибка: Пользователь не найден."
+        if saved is None:
+            return USER_NOT_FOUND_MESSAGE if user_missing else f"Упс {game_id} уже не существует."
+        role_count_cache.apply(game_id, saved.old_role, role)
+
+    async def remove_user_role(self, user_id: int, game_id: int) -> bool:
+        """
+        Удаляет роль пользователя в игре одним DELETE ... USING users ... RETURNING.
 
-            existing_game = await session.execute(
-                select(GameDate).filter_by(id=game_id)
+        :param user_id: Telegram id пользователя.
+        :param game_id: id игры.
+        :return: True, если роль была.
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(
+                delete(UserGameRole)
+                .where(UserGameRole.user_id == User.id, User.telegram_id == user_id, UserGameRole.game_id == game_id)
+                .returning(UserGameRole.role)
             )
-            game = existing_game.scalars().first()
+            deleted_role = result.scalar()
+            await session.commit()
 
-            if not game:
-                return f"Упс {game_id} уже не существует."
+        if deleted_role is None:
+            return False
+        role_count_cache.apply(game_id, deleted_role, None)
+        return True
 
-            existing_role = await self.get(user_id=user.id, game_id=game_id)
+    async def get_role_counts(self, game_id: int) -> Dict[str, int]:
+        """
+        Число пользователей с каждой ролью в игре: из role_count_cache или одним GROUP BY role.
 
-            if existing_role:
-                existing_role.role = role
-                await session.commit()
-                return
-            await self.create(user_id=user.id, game_id=game_id, role=role)
-            return
+        :param game_id: id игры.
+        :return: Роль → количество пользователей.
+        """
+        counts = role_count_cache.get(game_id)
+        if counts is not None:
+            return counts
+
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(UserGameRole.role, func.count())
+                .where(UserGameRole.game_id == game_id)
+                .group_by(UserGameRole.role)
+            )
+            counts = {role: count for role, count in result.all()}
+        role_count_cache.set(game_id, counts)
+        return counts
 
     async def get_opposite_role_users(self, game_id: int, opposite_role: str):
         """Возвращает список пользователей с противоположной ролью"""
@@ -165,15 +305,8 @@ class UserGameRoleDAO(BaseDAO):
 
     async def get_opposite_role_users_count(self, game_id: int, opposite_role: str):
         """Возвращает количество пользователей с противоположной ролью"""
-        async with self.session_factory() as session:
-            result = await session.execute(
-                select(User.id)
-                .join(UserGameRole, User.id == UserGameRole.user_id)
-                .filter(UserGameRole.game_id == game_id, UserGameRole.role == opposite_role)
-            )
-
-            users = result.scalars().all()
-            return len(users)
+        counts = await self.get_role_counts(game_id)
+        return counts.get(opposite_role, 0)
 
     async def is_user_searching(self, user_id: int, game_id: int) -> bool:
         """Проверяет, ищет ли пользователь игрока или команду в игре"""
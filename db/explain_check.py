@@ -0,0 +1,187 @@
+"""
+Проверка, что горячие запросы DAO идут по индексам.
+
+Создает отдельную схему в БД из настроек, заполняет ее синтетическими данными
+(большая часть игр — завершенные/архивные, как в живой таблице), выполняет запросы
+через настоящие методы DAO, перехватывает их SQL и смотрит EXPLAIN: в плане должен
+быть Index Scan/Index Only Scan/Bitmap Index Scan по ожидаемому индексу.
+Основная схема не затрагивается, проверочная удаляется в конце:
+
+    python -m db.explain_check [--games 20000] [--keep]
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
+
+from sqlalchemy import event, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from db.dao import GameDateDAO, UserGameRoleDAO, UserGameSubscriptionDAO
+from db.models import Base, GameDate, GameState, User, UserGameRole, UserGameSubscription
+from parser.deadlines import moscow_now
+from settings import DATABASE_URL
+
+CHECK_SCHEMA = "explain_check"
+INDEX_NODE_TYPES = ("Index Scan", "Index Only Scan", "Bitmap Index Scan")
+SEED_BATCH_SIZE = 2000
+# Значения user_game_role.role, которые пишут обработчики поиска команды
+PLAYER_ROLE = "Игрок"
+TEAM_ROLE = "Команда"
+
+
+def plan_indexes(plan: dict) -> Set[str]:
+    """Имена индексов, по которым в плане есть индексное сканирование."""
+    indexes = set()
+    if plan.get("Node Type") in INDEX_NODE_TYPES and plan.get("Index Name"):
+        indexes.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        indexes |= plan_indexes(child)
+    return indexes
+
+
+async def _insert(session_factory, model, rows: List[dict]) -> None:
+    async with session_factory() as session:
+        for offset in range(0, len(rows), SEED_BATCH_SIZE):
+            await session.execute(insert(model), rows[offset:offset + SEED_BATCH_SIZE])
+        await session.commit()
+
+
+async def seed(session_factory, games: int, seed_value: int = 0) -> List[int]:
+    """
+    Заполняет проверочную схему.
+
+    :return: id игр, у которых есть роли и подписчики.
+    """
+    rng = random.Random(seed_value)
+    now = moscow_now()
+    users = max(100, games // 4)
+    await _insert(session_factory, User, [
+        {"id": user_id, "telegram_id": 10 ** 9 + user_id, "nickname": f"user{user_id}"}
+        for user_id in range(1, users + 1)
+    ])
+
+    game_rows = []
+    for game_id in range(1, games + 1):
+        kind = rng.random()
+        if kind < 0.03:
+            # Предстоящая игра в далеком будущем: анонс еще не отправлен
+            start_date, state, sent = now + timedelta(days=rng.randint(6, 120)), GameState.UPCOMING, False
+        elif kind < 0.06:
+            start_date, state, sent = now + timedelta(hours=rng.randint(1, 120)), GameState.UPCOMING, True
+        elif kind < 0.08:
+            start_date, state, sent = now - timedelta(days=rng.randint(1, 14)), GameState.ACTIVE, True
+        else:
+            start_date = now - timedelta(days=rng.randint(15, 1500))
+            state, sent = rng.choice((GameState.COMPLETED, GameState.ARCHIVED)), True
+        game_rows.append({
+            "id": game_id, "domain": "kovrov.encounter.cx", "start_date": start_date,
+            "end_date": start_date + timedelta(days=rng.randint(1, 30)), "name": f"Игра {game_id}",
+            "author": "author", "price": "0", "game_type": rng.choice(("team", "single")),
+            "state": state.value, "is_announcement_sent": sent,
+            "is_start_message_sent": sent and state != GameState.UPCOMING,
+        })
+    await _insert(session_factory, GameDate, game_rows)
+
+    hot_games = [row["id"] for row in game_rows if row["state"] in (GameState.UPCOMING.value, GameState.ACTIVE.value)]
+    roles, subscriptions = [], []
+    for game_id in rng.sample(range(1, games + 1), min(games, len(hot_games) * 3)) + hot_games:
+        for user_id in rng.sample(range(1, users + 1), rng.randint(1, 20)):
+            roles.append({"user_id": user_id, "game_id": game_id, "role": rng.choice((PLAYER_ROLE, TEAM_ROLE))})
+            subscriptions.append({"user_id": user_id, "game_id": game_id})
+    # Одна пара (пользователь, игра) — одна строка
+    roles = list({(row["user_id"], row["game_id"]): row for row in roles}.values())
+    subscriptions = list({(row["user_id"], row["game_id"]): row for row in subscriptions}.values())
+    await _insert(session_factory, UserGameRole, roles)
+    await _insert(session_factory, UserGameSubscription, subscriptions)
+    return hot_games
+
+
+def build_checks(session_factory, game_id: int) -> List[Tuple[str, str, Callable[[], Awaitable]]]:
+    """(название, ожидаемый индекс, вызов DAO) для каждого горячего запроса."""
+    game_dao = GameDateDAO(session_factory)
+    role_dao = UserGameRoleDAO(session_factory)
+    subs_dao = UserGameSubscriptionDAO(session_factory)
+    now = moscow_now()
+    return [
+        ("анонсы (send_announcement_messages)", "ix_game_dates_announcement_pending",
+         lambda: game_dao.get_all(is_announcement_sent=False, start_date__lte=now + timedelta(days=5))),
+        ("стартовые сообщения (send_start_messages)", "ix_game_dates_start_message_pending",
+         lambda: game_dao.get_all(is_start_message_sent=False, start_date__lte=now + timedelta(hours=12))),
+        ("/upcoming", "ix_game_dates_state_start_date",
+         lambda: game_dao.get_all(state=GameState.UPCOMING.value, is_announcement_sent=True, order_by="start_date")),
+        ("/active", "ix_game_dates_state_end_date",
+         lambda: game_dao.get_all(state=GameState.ACTIVE.value, order_by="end_date")),
+        ("поиск команды: игроки с ролью", "ix_user_game_role_game_id_role",
+         lambda: role_dao.get_opposite_role_users(game_id, TEAM_ROLE)),
+        ("поиск команды: число игроков с ролью", "ix_user_game_role_game_id_role",
+         lambda: role_dao.get_opposite_role_users_count(game_id, PLAYER_ROLE)),
+        ("рассылка подписчикам", "ix_user_game_subscription_game_id",
+         lambda: subs_dao.get_subscriptions_for_notification(game_id, "equator")),
+        ("сброс флагов подписчиков", "ix_user_game_subscription_game_id",
+         lambda: subs_dao.reset_notification_flags_for_game(game_id)),
+    ]
+
+
+async def run_checks(engine, session_factory, game_id: int) -> List[Dict]:
+    captured: List[Tuple[str, tuple]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            captured.append((statement, parameters))
+
+    results = []
+    for name, expected, call in build_checks(session_factory, game_id):
+        captured.clear()
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            await call()
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+        used = set()
+        async with engine.connect() as conn:
+            for statement, parameters in captured:
+                result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                plan = result.scalar()
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                used |= plan_indexes(plan[0]["Plan"])
+        results.append({"query": name, "expected": expected, "used": sorted(used), "ok": expected in used})
+    return results
+
+
+async def main(games: int, keep: bool) -> int:
+    engine = create_async_engine(DATABASE_URL, connect_args={"server_settings": {"search_path": CHECK_SCHEMA}})
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {CHECK_SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {CHECK_SCHEMA}"))
+            await conn.run_sync(Base.metadata.create_all)
+
+        hot_games = await seed(session_factory, games)
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE"))
+
+        results = await run_checks(engine, session_factory, hot_games[0])
+    finally:
+        if not keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {CHECK_SCHEMA} CASCADE"))
+        await engine.dispose()
+
+    for result in results:
+        mark = "OK  " if result["ok"] else "FAIL"
+        print(f"{mark} {result['query']}: ожидался {result['expected']}, в плане {result['used'] or 'нет индексов'}")
+    return 0 if all(result["ok"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="EXPLAIN горячих запросов DAO на заполненной проверочной схеме")
+    arg_parser.add_argument("--games", type=int, default=20000)
+    arg_parser.add_argument("--keep", action="store_true", help="не удалять проверочную схему")
+    args = arg_parser.parse_args()
+    sys.exit(asyncio.run(main(args.games, args.keep)))
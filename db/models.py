@@ -81,7 +81,7 @@
 #     def __repr__(self):
 #         return f"<GameDate(id={self.id}, name='{self.name}')>"
 
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DateTime, Boolean, Enum, text, BigInteger
+from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DateTime, Boolean, Enum, text, BigInteger, Index
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.ext.declarative import declarative_base
 from enum import Enum as PyEnum
@@ -112,6 +112,11 @@ class UserGameSubscription(Base):
     is_2days_before_end_notified = Column(Boolean, nullable=False, default=False, server_default=text('false'))
     is_game_started_notified = Column(Boolean, nullable=False, default=False, server_default=text('false'))
 
+    __table_args__ = (
+        # Первичный ключ начинается с user_id; рассылка подписчикам и сброс флагов ищут по game_id
+        Index('ix_user_game_subscription_game_id', 'game_id'),
+    )
+
     # Связь с пользователем
     user = relationship("User", backref=backref("subscribed_games", cascade="all, delete-orphan"))
     # Связь с игрой
@@ -128,6 +133,11 @@ class UserGameRole(Base):
     game_id = Column(Integer, ForeignKey("game_dates.id", ondelete="CASCADE"), primary_key=True)
     role = Column(String, nullable=False)
 
+    __table_args__ = (
+        # Поиск команды/игроков: пользователи с ролью в игре
+        Index('ix_user_game_role_game_id_role', 'game_id', 'role'),
+    )
+
     # Связь с пользователем
     user = relationship("User", backref=backref("game_roles", cascade="all, delete-orphan"))
     # Связь с игрой
@@ -168,5 +178,14 @@ class GameDate(Base):
     is_announcement_sent = Column(Boolean, nullable=False, default=False, server_default=text('false'))
     is_start_message_sent = Column(Boolean, nullable=False, default=False, server_default=text('false'))
 
+    __table_args__ = (
+        # Анонсы и стартовые сообщения: еще не отправленные, start_date <= X
+        Index('ix_game_dates_announcement_pending', 'start_date', postgresql_where=text('NOT is_announcement_sent')),
+        Index('ix_game_dates_start_message_pending', 'start_date', postgresql_where=text('NOT is_start_message_sent')),
+        # /upcoming и /active: фильтр по состоянию с сортировкой по началу/окончанию
+        Index('ix_game_dates_state_start_date', 'state', 'start_date'),
+        Index('ix_game_dates_state_end_date', 'state', 'end_date'),
+    )
+
     def __repr__(self):
         return f"<GameDate(id={self.id}, name='{self.name}')>"
@@ -0,0 +1,112 @@
+"""
+Проверка ответов подписки и поиска команды, когда пользователя или игры нет в БД.
+
+Мутации UserGameSubscriptionDAO/UserGameRoleDAO выполняются одним запросом, а причину
+неудачи выясняют отдельно; здесь проверяется, что пользователь видит те же тексты, что
+и раньше. Создает отдельную схему в БД из настроек, основная схема не затрагивается,
+проверочная удаляется в конце:
+
+    python -m db.mutation_check [--keep]
+"""
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, List, Tuple
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from db.dao import UserGameRoleDAO, UserGameSubscriptionDAO
+from db.dao.subs import USER_NOT_FOUND_MESSAGE
+from db.models import Base, GameDate, GameState, User
+from parser.deadlines import moscow_now
+from settings import DATABASE_URL
+
+CHECK_SCHEMA = "mutation_check"
+KNOWN_USER = 10 ** 9 + 1
+MISSING_USER = 10 ** 9 + 2
+KNOWN_GAME = 1
+MISSING_GAME = 2
+
+
+async def seed(session_factory) -> None:
+    start_date = moscow_now() + timedelta(days=3)
+    async with session_factory() as session:
+        await session.execute(insert(User), [{"id": 1, "telegram_id": KNOWN_USER, "nickname": "user1"}])
+        await session.execute(insert(GameDate), [{
+            "id": KNOWN_GAME, "domain": "kovrov.encounter.cx", "start_date": start_date,
+            "end_date": start_date + timedelta(hours=6), "name": "Игра 1", "author": "author", "price": "0",
+            "game_type": "team", "state": GameState.UPCOMING.value,
+        }])
+        await session.commit()
+
+
+def build_checks(session_factory) -> List[Tuple[str, Callable[[], Awaitable], Any]]:
+    """(название, вызов DAO, ожидаемый результат); порядок важен — проверки идут на одной схеме."""
+    subs_dao = UserGameSubscriptionDAO(session_factory)
+    role_dao = UserGameRoleDAO(session_factory)
+    return [
+        ("подписка: нет пользователя",
+         lambda: subs_dao.add_user_to_subscription(MISSING_USER, KNOWN_GAME), USER_NOT_FOUND_MESSAGE),
+        ("подписка: нет ни пользователя, ни игры",
+         lambda: subs_dao.add_user_to_subscription(MISSING_USER, MISSING_GAME),
+         f"Упс {MISSING_GAME} уже не существует."),
+        ("подписка: нет игры",
+         lambda: subs_dao.add_user_to_subscription(KNOWN_USER, MISSING_GAME),
+         f"Упс {MISSING_GAME} уже не существует."),
+        ("подписка",
+         lambda: subs_dao.add_user_to_subscription(KNOWN_USER, KNOWN_GAME),
+         f"Вы успешно подписались на игру {KNOWN_GAME}."),
+        ("повторная подписка",
+         lambda: subs_dao.add_user_to_subscription(KNOWN_USER, KNOWN_GAME),
+         f"Вы уже подписаны на игру {KNOWN_GAME}."),
+        ("отписка: нет пользователя",
+         lambda: subs_dao.remove_user_from_subscription(MISSING_USER, KNOWN_GAME), USER_NOT_FOUND_MESSAGE),
+        ("отписка",
+         lambda: subs_dao.remove_user_from_subscription(KNOWN_USER, KNOWN_GAME),
+         f"Вы успешно отписались от игры {KNOWN_GAME}."),
+        ("повторная отписка",
+         lambda: subs_dao.remove_user_from_subscription(KNOWN_USER, KNOWN_GAME),
+         f"Вы не подписаны на игру {KNOWN_GAME}."),
+        ("роль: нет пользователя",
+         lambda: role_dao.add_user_role(MISSING_USER, KNOWN_GAME, "Игрок"), USER_NOT_FOUND_MESSAGE),
+        ("роль: нет игры",
+         lambda: role_dao.add_user_role(KNOWN_USER, MISSING_GAME, "Игрок"),
+         f"Упс {MISSING_GAME} уже не существует."),
+        ("роль", lambda: role_dao.add_user_role(KNOWN_USER, KNOWN_GAME, "Игрок"), None),
+        ("отмена поиска: нет пользователя", lambda: role_dao.remove_user_role(MISSING_USER, KNOWN_GAME), False),
+        ("отмена поиска", lambda: role_dao.remove_user_role(KNOWN_USER, KNOWN_GAME), True),
+    ]
+
+
+async def main(keep: bool) -> int:
+    engine = create_async_engine(DATABASE_URL, connect_args={"server_settings": {"search_path": CHECK_SCHEMA}})
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    results = []
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {CHECK_SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {CHECK_SCHEMA}"))
+            await conn.run_sync(Base.metadata.create_all)
+
+        await seed(session_factory)
+        for name, call, expected in build_checks(session_factory):
+            got = await call()
+            results.append((name, expected, got))
+    finally:
+        if not keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {CHECK_SCHEMA} CASCADE"))
+        await engine.dispose()
+
+    for name, expected, got in results:
+        mark = "OK  " if got == expected else "FAIL"
+        print(f"{mark} {name}: ожидалось {expected!r}, получено {got!r}")
+    return 0 if all(got == expected for _, expected, got in results) else 1
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Ответы подписки и поиска команды без пользователя/игры в БД")
+    arg_parser.add_argument("--keep", action="store_true", help="не удалять проверочную схему")
+    sys.exit(asyncio.run(main(arg_parser.parse_args().keep)))
@@ -3,71 +3,63 @@ from datetime import datetime
 from sqlalchemy import delete
 
 from db.dao import GameDateDAO
+from db.dao.game import game_row_cache
+from db.dao.subs import role_count_cache
 from db.models import GameState, UserGameSubscription, UserGameRole
 from loader import db, user_role_dao, user_subs_dao
 from logging_config import bot_logger
 import pytz
 from functools import wraps
+from typing import Iterable
 from aiogram import types
 
 game_dao = GameDateDAO(db.async_session)
 
 
-async def update_game_states():
+def _state_change_reason(new_state: GameState, start_date: datetime, end_date, now: datetime) -> str:
+    """Причина смены статуса для лога — те же условия, что в GameDateDAO.update_states."""
+    if new_state == GameState.UPCOMING:
+        return f"start_date ({start_date}) > now ({now})"
+    if new_state == GameState.ACTIVE:
+        if end_date is None:
+            return f"start_date ({start_date}) <= now ({now}), end_date=None"
+        return f"start_date ({start_date}) <= now ({now}), end_date ({end_date}) > now"
+    return f"start_date ({start_date}) <= now ({now}), end_date ({end_date if end_date else 'None'}) <= now"
+
+
+async def update_game_states(restore_ids: Iterable[int] = ()):
     """
     Обновляет статусы игр в зависимости от текущего времени.
+
+    :param restore_ids: Архивные игры, которые снова нашлись в календаре (см. GameDateDAO.update_states).
     """
     bot_logger.info("Starting the game state update process.")
     try:
-
-        games = await game_dao.get_all()
         updated_counts = {GameState.UPCOMING: 0, GameState.ACTIVE: 0, GameState.COMPLETED: 0}
 
         moscow_tz = pytz.timezone('Europe/Moscow')
         now = datetime.now(moscow_tz).replace(tzinfo=None)
 
-        async with game_dao.session_factory() as session:
-            for game in games:
-                # Не трогаем игры, которые уже завершены парсером
-                if game.state == GameState.COMPLETED.value:
-                    continue
-
-                game_start_date = game.start_date.replace(tzinfo=None)
-
-                if game_start_date > now:
-                    new_state = GameState.UPCOMING
-                elif game_start_date <= now and (game.end_date is None or game.end_date.replace(tzinfo=None) > now):
-                    new_state = GameState.ACTIVE
-                else:
-                    new_state = GameState.COMPLETED
-
-                if game.state != new_state.value:
-                    # Определяем причину смены статуса
-                    if new_state == GameState.UPCOMING:
-                        reason = f"start_date ({game_start_date}) > now ({now})"
-                    elif new_state == GameState.ACTIVE:
-                        if game.end_date is None:
-                            reason = f"start_date ({game_start_date}) <= now ({now}), end_date=None"
-                        else:
-                            reason = f"start_date ({game_start_date}) <= now ({now}), end_date ({game.end_date.replace(tzinfo=None)}) > now"
-                    else:  # COMPLETED
-                        reason = f"start_date ({game_start_date}) <= now ({now}), end_date ({game.end_date.replace(tzinfo=None) if game.end_date else 'None'}) <= now"
-
-                    bot_logger.info(
-                        f"Updating game {game.id} from {game.state} to {new_state}. "
-                        f"Причина: {reason}. Ссылка: https://{game.domain}/GameDetails.aspx?gid={game.id}"
-                    )
-                    game.state = new_state.value
-                    await session.merge(game)
-                    updated_counts[new_state] += 1
-
-            await session.commit()
+        # Один UPDATE по живым играм: завершенные и архивные (кроме restore_ids) не читаются вовсе
+        rows = await game_dao.update_states(now, restore_ids)
+        for game_id, old_state, state, start_date, end_date, domain in rows:
+            new_state = GameState(state)
+            reason = _state_change_reason(new_state, start_date, end_date, now)
+            bot_logger.info(
+                f"Updating game {game_id} from {old_state} to {new_state}. "
+                f"Причина: {reason}. Ссылка: https://{domain}/GameDetails.aspx?gid={game_id}"
+            )
+            updated_counts[new_state] += 1
+            if new_state == GameState.COMPLETED:
+                role_count_cache.invalidate([game_id])
+
         bot_logger.info(
             "Game state update process completed successfully. "
             f"Changed: UPCOMING={updated_counts[GameState.UPCOMING]}, "
             f"ACTIVE={updated_counts[GameState.ACTIVE]}, "
             f"COMPLETED={updated_counts[GameState.COMPLETED]}"
         )
+        game_row_cache.log_stats()
     except Exception as e:
         bot_logger.error(f"Error during game state update: {e}")
 
@@ -90,11 +82,10 @@ def ensure_user_registered(user_dao):
 
 
 async def get_players_and_teams_count(game_id: int) -> dict:
-    """Возвращает количество доступных игроков и команд для игры."""
-    players_count = await user_role_dao.get_opposite_role_users_count(game_id, "Игрок")
-    teams_count = await user_role_dao.get_opposite_role_users_count(game_id, "Команда")
+    """Возвращает количество доступных игроков и команд для игры (см. RoleCountCache)."""
+    counts = await user_role_dao.get_role_counts(game_id)
 
     return {
-        "players": players_count,
-        "teams": teams_count
+        "players": counts.get("Игрок", 0),
+        "teams": counts.get("Команда", 0)
     }
@@ -1,8 +1,7 @@
 from aiogram import Router, types, F
-from pathlib import Path
 from aiogram.exceptions import TelegramForbiddenError
 from aiogram.filters import Command, CommandStart
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery
 from db.models import GameState
 from db.utils import ensure_user_registered, get_players_and_teams_count
 from filters import PrivateChatFilter
@@ -12,7 +11,8 @@ from keyboards.game_keyboards import create_main_game_keyboard, SubscribeCallbac
     create_team_search_menu_keyboard, create_only_link_keyboard
 from loader import game_dao, user_dao, user_subs_dao, user_role_dao
 from logging_config import bot_logger
-from messages.messages import format_game_message
+from messages.messages import format_game_message, get_game_photo_path
+from messages.photo_cache import send_cached_photo
 
 router = Router()
 
@@ -131,17 +131,11 @@ async def upcoming_games_command(message: Message):
             #     reply_markup=keyboard
             # )
             # file_name = image_url.split("/")[-1] if image_url else None
-            file_name = str(game_id) + '.' + image_url.split('.')[-1] if image_url else None
-            photo_path = Path(f"images/{file_name}").resolve()
-            if not photo_path.exists() or not photo_path.is_file():
-                bot_logger.info(
-                    f"❌ Файл {photo_path} не найден. Используем изображение по умолчанию. "
-                    f"Игра ID={game_id}, ссылка: {game_link}"
-                )
-                photo_path = Path("images/DEFAULT.jpg").resolve()
-
-            await message.answer_photo(
-                photo=FSInputFile(str(photo_path)),
+            photo_path = get_game_photo_path(image_url, game_id, game_link)
+
+            await send_cached_photo(
+                message.answer_photo,
+                photo_path,
                 caption=game_text,
                 parse_mode="HTML",
                 reply_markup=keyboard
@@ -174,17 +168,11 @@ async def active_games_command(message: Message):
             #     reply_markup=keyboard
             # )
             # file_name = image_url.split("/")[-1] if image_url else None
-            file_name = str(game_id) + '.' + image_url.split('.')[-1] if image_url else None
-            photo_path = Path(f"images/{file_name}").resolve()
-            if not photo_path.exists() or not photo_path.is_file():
-                bot_logger.info(
-                    f"❌ Файл {photo_path} не найден. Используем изображение по умолчанию. "
-                    f"Игра ID={game_id}, ссылка: {game_link}"
-                )
-                photo_path = Path("images/DEFAULT.jpg").resolve()
-
-            await message.answer_photo(
-                photo=FSInputFile(str(photo_path)),
+            photo_path = get_game_photo_path(image_url, game_id, game_link)
+
+            await send_cached_photo(
+                message.answer_photo,
+                photo_path,
                 caption=game_text,
                 parse_mode="HTML",
                 reply_markup=keyboard
@@ -270,17 +258,11 @@ async def subs_command(message: types.Message):
         image_url = game.image
 
         # file_name = image_url.split("/")[-1] if image_url else None
-        file_name = str(game.id) + '.' + image_url.split('.')[-1] if image_url else None
-        photo_path = Path(f"images/{file_name}").resolve()
-        if not photo_path.exists() or not photo_path.is_file():
-            bot_logger.info(
-                f"❌ Файл {photo_path} не найден. Используем изображение по умолчанию. "
-                f"Игра ID={game.id}, ссылка: {game.link}"
-            )
-            photo_path = Path("images/DEFAULT.jpg").resolve()
+        photo_path = get_game_photo_path(image_url, game.id, game.link)
 
-        await message.answer_photo(
-            photo=FSInputFile(str(photo_path)),
+        await send_cached_photo(
+            message.answer_photo,
+            photo_path,
             caption=text,
             parse_mode="HTML",
             reply_markup=keyboard
@@ -337,10 +319,7 @@ async def handle_game_role_callback(callback_query: CallbackQuery, callback_data
         return f"Упс {game_id} уже не существует."
 
     if action == "cancel_search":
-        user = await user_dao.get(telegram_id=user_id)
-        user_role = await user_role_dao.get(user_id=user.id, game_id=game_id)
-        if user_role:
-            await user_role_dao.delete(user_id=user.id, game_id=game_id)
+        await user_role_dao.remove_user_role(user_id=user_id, game_id=game_id)
 
         response_text = "Вы успешно отписались от поиска."
 
@@ -5,6 +5,8 @@ from aiogram.client.telegram import TelegramAPIServer
 from db.dao import *
 from settings import DATABASE_URL, settings
 from db import DatabaseManager
+from parser.http_client import HttpClient
+from parser.replay import ReplayProfile
 
 api = TelegramAPIServer.from_base(settings.TELEGRAM_API_BASE)
 session = AiohttpSession(api=api)
@@ -22,3 +24,13 @@ game_dao = GameDateDAO(db.async_session)
 user_dao = UserDAO(db.async_session)
 user_subs_dao = UserGameSubscriptionDAO(db.async_session)
 user_role_dao = UserGameRoleDAO(db.async_session)
+
+# Общий HTTP-клиент парсера и загрузчика изображений
+http_client = HttpClient(
+    mode=settings.PARSER_HTTP_MODE,
+    corpus_dir=settings.PARSER_HTTP_CORPUS,
+    replay_profile=ReplayProfile(
+        latency=settings.PARSER_REPLAY_LATENCY,
+        error_rate=settings.PARSER_REPLAY_ERROR_RATE,
+    ),
+)
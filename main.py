@@ -2,13 +2,16 @@ import asyncio
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from aiogram import Router
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from db.utils import update_game_states
 from keyboards.game_keyboards import set_main_menu
-from loader import bot, dp, db, game_dao, user_dao, user_subs_dao
+from loader import bot, dp, db, game_dao, user_dao, user_subs_dao, http_client
 from logging_config import bot_logger
 from messages.scheduler_messages import check_and_send_messages
-from parser.parser import run_parsing, parsing_active_games
+from parser.executor import parsing_executor
+from parser.parser import run_parsing, refresh_due_games
+from settings import settings
 from handlers.main_handlers import router as main_router
 
 router = Router()
@@ -20,6 +23,7 @@ async def on_startup(dp):
     """
     bot_logger.info("Bot startup initiated")
     await set_main_menu(bot)
+    await http_client.start()
 
     dp.include_router(router)
     dp.include_router(main_router)
@@ -27,8 +31,10 @@ async def on_startup(dp):
 
     scheduler = AsyncIOScheduler(timezone="Europe/Moscow")
 
-    scheduler.add_job(run_parsing, CronTrigger(minute="15,45"))
-    scheduler.add_job(parsing_active_games, CronTrigger(minute="55"))
+    # Обход календарей: обновление предстоящих игр и переходы ACTIVE/COMPLETED/ARCHIVED.
+    # Страницы игр в нем качаются по срокам, а между обходами их перепроверяет refresh_due_games
+    scheduler.add_job(run_parsing, IntervalTrigger(minutes=settings.PARSER_CALENDAR_INTERVAL))
+    scheduler.add_job(refresh_due_games, IntervalTrigger(minutes=settings.PARSER_REFRESH_TICK))
     scheduler.add_job(check_and_send_messages, CronTrigger(minute="20,50"), args=[game_dao, user_subs_dao, user_dao, bot])
     scheduler.add_job(update_game_states, CronTrigger(minute="5,35"))
 
@@ -41,7 +47,11 @@ async def on_startup(dp):
     # scheduler.add_job(check_and_send_messages, IntervalTrigger(minutes=2), args=[game_dao, bot])
     # scheduler.add_job(update_game_states, IntervalTrigger(minutes=2))
 
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await http_client.close()
+        parsing_executor.shutdown()
 
 
 if __name__ == '__main__':
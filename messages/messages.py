@@ -3,16 +3,39 @@ from typing import Optional
 from datetime import datetime, timedelta
 import pytz
 from aiogram.enums import ParseMode
-from aiogram.types import FSInputFile
 from aiogram.exceptions import TelegramForbiddenError
 
 from db.models import GameDate
 from keyboards.constants import GAME_ANNOUNCEMENT, GAME_START, GAME_DATE_CHANGE, GAME_EQUATOR, GAME_2DAYS_BEFORE_END, GAME_STARTED_PERSONAL
 from keyboards.game_keyboards import default_game_keyboard, subscriber_notification_keyboard
 from logging_config import bot_logger
+from messages.photo_cache import send_cached_photo
 from settings import  CHATS_ID
 
 
+DEFAULT_PHOTO_PATH = Path("images/DEFAULT.jpg")
+
+
+def get_game_photo_path(image: Optional[str], game_id: int, link: Optional[str] = None, log_missing: bool = True) -> Path:
+    """
+    Возвращает путь к обложке игры или к изображению по умолчанию, если файла нет.
+
+    :param image: Локальный путь обложки из game_dates.image.
+    :param game_id: ID игры (для логов).
+    :param link: Ссылка на игру (для логов).
+    :param log_missing: Писать ли в лог об отсутствующем файле.
+    """
+    photo_path = Path(image).resolve() if image else None
+    if photo_path is None or not photo_path.is_file():
+        if log_missing:
+            bot_logger.info(
+                f"❌ Файл {photo_path} не найден. Используем изображение по умолчанию. "
+                f"Игра ID={game_id}, ссылка: {link}"
+            )
+        photo_path = DEFAULT_PHOTO_PATH.resolve()
+    return photo_path
+
+
 def get_user_facing_link(link: str) -> str:
     """Заменяет .encounter.cx на .en.cx для отображения пользователю."""
     if not link:
@@ -95,20 +118,13 @@ async def send_game_message(bot, game, message_type: str):
 
     try:
         # await bot.send_message(settings.CHAT_ID, message, parse_mode=ParseMode.HTML, reply_markup=keyboard)
-        file_name = str(game.id) + '.' + game.image.split('.')[-1] if game.image else None
-        photo_path = Path(f"images/{file_name}").resolve()
-
-        if not photo_path.exists() or not photo_path.is_file():
-            bot_logger.info(
-                f"❌ Файл {photo_path} не найден. Используем изображение по умолчанию. "
-                f"Игра ID={game.id}, ссылка: {game.link}"
-            )
-            photo_path = Path("images/DEFAULT.jpg").resolve()
+        photo_path = get_game_photo_path(game.image, game.id, game.link)
 
         for chat in CHATS_ID:
-            await bot.send_photo(
+            await send_cached_photo(
+                bot.send_photo,
+                photo_path,
                 chat_id=chat,
-                photo=FSInputFile(str(photo_path)),
                 caption=message,
                 parse_mode=ParseMode.HTML,
                 reply_markup=keyboard
@@ -206,20 +222,13 @@ async def send_game_message_date_change(
 
     try:
         # await bot.send_message(settings.CHAT_ID, message, parse_mode=ParseMode.HTML, reply_markup=keyboard)
-        file_name = str(game.id) + '.' + game.image.split('.')[-1] if game.image else None
-        photo_path = Path(f"images/{file_name}").resolve()
-
-        if not photo_path.exists() or not photo_path.is_file():
-            bot_logger.info(
-                f"❌ Файл {photo_path} не найден. Используем изображение по умолчанию. "
-                f"Игра ID={game.id}, ссылка: {game.link}"
-            )
-            photo_path = Path("images/DEFAULT.jpg").resolve()
+        photo_path = get_game_photo_path(game.image, game.id, game.link)
 
         for chat in CHATS_ID:
-            await bot.send_photo(
+            await send_cached_photo(
+                bot.send_photo,
+                photo_path,
                 chat_id=chat,
-                photo=FSInputFile(str(photo_path)),
                 caption=message,
                 parse_mode=ParseMode.HTML,
                 reply_markup=keyboard
@@ -253,6 +262,7 @@ async def send_announcement_messages(game_dao, bot):
             async with game_dao.session_factory() as session:
                 await session.merge(game)
                 await session.commit()
+            game_dao.invalidate_cache([game.id])
 
             bot_logger.info(f"Game {game.id} updated after sending announcement.")
 
@@ -280,6 +290,7 @@ async def send_start_messages(game_dao, bot):
             async with game_dao.session_factory() as session:
                 await session.merge(game)
                 await session.commit()
+            game_dao.invalidate_cache([game.id])
 
             bot_logger.info(f"Game {game.id} updated after sending start message.")
 
@@ -327,18 +338,15 @@ async def send_subscriber_notification(
 ) -> bool:
     """Отправляет личное уведомление подписчику. Возвращает True если успешно."""
     try:
-        file_name = str(game.id) + '.' + game.image.split('.')[-1] if game.image else None
-        photo_path = Path(f"images/{file_name}").resolve() if file_name else None
-
-        if not photo_path or not photo_path.exists() or not photo_path.is_file():
-            photo_path = Path("images/DEFAULT.jpg").resolve()
+        photo_path = get_game_photo_path(game.image, game.id, log_missing=False)
 
         message = format_subscriber_notification_message(game, notification_type)
         keyboard = subscriber_notification_keyboard(game.id)
 
-        await bot.send_photo(
+        await send_cached_photo(
+            bot.send_photo,
+            photo_path,
             chat_id=user_telegram_id,
-            photo=FSInputFile(str(photo_path)),
             caption=message,
             parse_mode=ParseMode.HTML,
             reply_markup=keyboard
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from logging_config import bot_logger
+
+FILE_ID_CACHE_PATH = "cache/telegram_file_ids.json"
+# Обложки из parser.images уже названы по sha256 содержимого
+CONTENT_HASH_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+
+class PhotoFileIdCache:
+    """
+    Постоянный кэш file_id Telegram для обложек, ключ — sha256 содержимого файла.
+
+    Первая отправка загружает файл и запоминает file_id из ответа, последующие
+    отправки той же картинки передают только file_id. Новая обложка имеет другой хэш
+    и загружается заново; file_id, который Telegram перестал принимать, удаляется.
+    """
+
+    def __init__(self, path: str = FILE_ID_CACHE_PATH):
+        self.path = path
+        self.file_ids: Optional[Dict[str, str]] = None
+        # Хэши файлов со старыми именами (images/<id>.jpg): путь → (mtime, размер, хэш)
+        self.hashes: Dict[str, Tuple[int, int, str]] = {}
+        self.hits = 0
+        self.uploads = 0
+
+    def _load(self) -> Dict[str, str]:
+        if self.file_ids is None:
+            try:
+                with open(self.path, encoding="utf-8") as file:
+                    self.file_ids = json.load(file)
+            except (OSError, ValueError):
+                self.file_ids = {}
+        return self.file_ids
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(self.file_ids, file)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            bot_logger.warning(f"Не удалось сохранить кэш file_id: {e}")
+
+    def image_hash(self, photo_path: Path) -> str:
+        """sha256 содержимого: из имени файла или по самому файлу (с учетом mtime)."""
+        if CONTENT_HASH_NAME.match(photo_path.stem):
+            return photo_path.stem
+        stat = photo_path.stat()
+        cached = self.hashes.get(str(photo_path))
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        digest = hashlib.sha256(photo_path.read_bytes()).hexdigest()
+        self.hashes[str(photo_path)] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def get(self, photo_path: Path) -> Optional[str]:
+        return self._load().get(self.image_hash(photo_path))
+
+    def remember(self, photo_path: Path, message: Message) -> None:
+        if not message or not message.photo:
+            return
+        key = self.image_hash(photo_path)
+        file_id = message.photo[-1].file_id
+        if self._load().get(key) != file_id:
+            self.file_ids[key] = file_id
+            self._save()
+
+    def invalidate(self, photo_path: Path) -> None:
+        if self._load().pop(self.image_hash(photo_path), None) is not None:
+            self._save()
+
+    async def send_photo(
+            self,
+            send: Callable[..., Awaitable[Message]],
+            photo_path: Path,
+            **kwargs,
+    ) -> Message:
+        """
+        Отправляет фото через send (bot.send_photo или message.answer_photo),
+        используя сохраненный file_id, если он есть.
+
+        :param send: Метод отправки фото aiogram.
+        :param photo_path: Путь к файлу изображения.
+        :param kwargs: Остальные аргументы send (chat_id, caption, reply_markup, ...).
+        :return: Отправленное сообщение.
+        """
+        file_id = self.get(photo_path)
+        if file_id:
+            try:
+                message = await send(photo=file_id, **kwargs)
+                self.hits += 1
+                return message
+            except TelegramBadRequest as e:
+                bot_logger.warning(f"file_id для {photo_path.name} отклонен ({e}), загружаем файл заново")
+                self.invalidate(photo_path)
+
+        message = await send(photo=FSInputFile(str(photo_path)), **kwargs)
+        self.uploads += 1
+        self.remember(photo_path, message)
+        return message
+
+
+photo_cache = PhotoFileIdCache()
+
+
+async def send_cached_photo(send: Callable[..., Awaitable[Message]], photo_path: Union[str, Path], **kwargs) -> Message:
+    """Отправляет фото через общий кэш file_id (см. PhotoFileIdCache.send_photo)."""
+    return await photo_cache.send_photo(send, Path(photo_path), **kwargs)
@@ -0,0 +1,226 @@
+"""
+Бэкенды разбора HTML для календаря и страниц игр.
+
+SoupBackend строит полное дерево через html.parser и работает без дополнительных
+зависимостей. LxmlBackend разбирает документ через lxml и SoupStrainer оставляет
+только нужные узлы: строки GamesRepeater, ячейку пагинации, spanMaxTeamPlayers,
+обложку и ячейку с датой окончания.
+
+Запуск как модуля сравнивает оба бэкенда на сохраненных страницах:
+
+    python -m parser.backends [--active] [--single] page1.html page2.html ...
+"""
+import argparse
+import sys
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+GAMES_ROW_ID_PREFIX = "ctl20_ctl00_GamesRepeater"
+COVER_MARKER = "обложка"
+END_DATE_MARKER = "Время окончания"
+
+
+def _is_cover(tag) -> bool:
+    return any(COVER_MARKER in (tag.get(attr) or "").lower() for attr in ["title", "alt"])
+
+
+class HtmlBackend(ABC):
+    """Базовый бэкенд: общая логика извлечения поверх дерева BeautifulSoup."""
+    name = "base"
+
+    @abstractmethod
+    def calendar_soup(self, html: str) -> BeautifulSoup:
+        """Дерево страницы календаря."""
+
+    @abstractmethod
+    def details_soup(self, html: str) -> BeautifulSoup:
+        """Дерево страницы игры."""
+
+    def extract_calendar_page(self, html: str) -> dict:
+        """
+        Извлекает строки игр и ссылки пагинации из страницы календаря.
+
+        :param html: Текст HTML.
+        :return: {"rows": [[текст ячеек строки], ...], "pagination": [ссылки]}
+        """
+        return self.calendar_from_soup(self.calendar_soup(html))
+
+    @staticmethod
+    def calendar_from_soup(soup: BeautifulSoup) -> dict:
+        """Извлекает строки игр и пагинацию из уже построенного дерева календаря."""
+        rows = soup.find_all("tr", id=lambda x: x and x.startswith(GAMES_ROW_ID_PREFIX))
+
+        pagination_td = soup.find('td', align="left")
+        pagination = [a['href'] for a in pagination_td.find_all('a', href=True)] if pagination_td else []
+
+        return {
+            "rows": [[cell.get_text(strip=True) for cell in row.find_all("td")] for row in rows],
+            "pagination": pagination,
+        }
+
+    def extract_game_details(self, html: Optional[str]) -> dict:
+        """
+        Извлекает обложку, лимит игроков и дату окончания со страницы GameDetails.aspx.
+
+        :param html: Текст HTML или None.
+        :return: Словарь с ключами image, max_players, end_date (отсутствующие не включаются).
+        """
+        if not html:
+            return {}
+        return self.details_from_soup(self.details_soup(html))
+
+    @staticmethod
+    def details_from_soup(soup: BeautifulSoup) -> dict:
+        """Извлекает обложку, лимит игроков и дату окончания из уже построенного дерева страницы игры."""
+        details = {}
+        for img_tag in soup.find_all("img"):
+            if _is_cover(img_tag):
+                details["image"] = img_tag["src"]
+                break
+
+        span_max_players = soup.find('span', id='spanMaxTeamPlayers')
+        if span_max_players:
+            details["max_players"] = span_max_players.get_text(strip=True)
+
+        for td in soup.find_all('td', height="18"):
+            if END_DATE_MARKER in td.text:
+                span_end_date = td.find('span', class_='white')
+                if span_end_date:
+                    details["end_date"] = ' '.join(span_end_date.text.strip().split()[:2])
+                    break
+
+        return details
+
+
+class SoupBackend(HtmlBackend):
+    """Полное дерево через стандартный html.parser."""
+    name = "html.parser"
+
+    def calendar_soup(self, html: str) -> BeautifulSoup:
+        return BeautifulSoup(html, "html.parser")
+
+    def details_soup(self, html: str) -> BeautifulSoup:
+        return BeautifulSoup(html, "html.parser")
+
+
+def _calendar_nodes(name: str, attrs: dict) -> bool:
+    if name == "tr":
+        return (attrs.get("id") or "").startswith(GAMES_ROW_ID_PREFIX)
+    return name == "td" and attrs.get("align") == "left"
+
+
+def _details_nodes(name: str, attrs: dict) -> bool:
+    if name == "img":
+        return _is_cover(attrs)
+    if name == "span":
+        return attrs.get("id") == "spanMaxTeamPlayers"
+    return name == "td" and attrs.get("height") == "18"
+
+
+class LxmlBackend(HtmlBackend):
+    """lxml с SoupStrainer: в дерево попадают только нужные узлы."""
+    name = "lxml"
+
+    def calendar_soup(self, html: str) -> BeautifulSoup:
+        return BeautifulSoup(html, "lxml", parse_only=SoupStrainer(_calendar_nodes))
+
+    def details_soup(self, html: str) -> BeautifulSoup:
+        return BeautifulSoup(html, "lxml", parse_only=SoupStrainer(_details_nodes))
+
+
+BACKENDS: Dict[str, HtmlBackend] = {
+    SoupBackend.name: SoupBackend(),
+    LxmlBackend.name: LxmlBackend(),
+}
+# html.parser по умолчанию: на битой разметке lxml находит другое число строк календаря
+# (calendar_malformed.html: 3 игры против 2), lxml включается явно через PARSER_HTML_BACKEND
+DEFAULT_BACKEND = SoupBackend.name
+
+
+def get_backend(name: Optional[str] = None) -> HtmlBackend:
+    """Возвращает бэкенд по имени; без lxml всегда откатывается на html.parser."""
+    name = name or DEFAULT_BACKEND
+    if name == LxmlBackend.name and not LXML_AVAILABLE:
+        return BACKENDS[SoupBackend.name]
+    return BACKENDS.get(name, BACKENDS[SoupBackend.name])
+
+
+def diff_calendar_page(html: str, game_type: str = "team", is_active: bool = False) -> List[str]:
+    """
+    Сравнивает результат разбора календаря обоими бэкендами.
+
+    :return: Список расхождений (пустой, если GameDate и пагинация совпали).
+    """
+    from .calendar import build_games_from_rows
+
+    reference = SoupBackend().extract_calendar_page(html)
+    candidate = LxmlBackend().extract_calendar_page(html)
+
+    differences = []
+    if reference["pagination"] != candidate["pagination"]:
+        differences.append(f"pagination: {reference['pagination']} != {candidate['pagination']}")
+
+    reference_games = [g.model_dump() for g in build_games_from_rows(reference["rows"], game_type, is_active)]
+    candidate_games = [g.model_dump() for g in build_games_from_rows(candidate["rows"], game_type, is_active)]
+    if len(reference_games) != len(candidate_games):
+        differences.append(f"games: {len(reference_games)} != {len(candidate_games)}")
+    for reference_game, candidate_game in zip(reference_games, candidate_games):
+        if reference_game != candidate_game:
+            differences.append(f"game {reference_game['id']}: {reference_game} != {candidate_game}")
+    return differences
+
+
+def diff_game_details(html: str) -> List[str]:
+    """
+    Сравнивает результат разбора страницы игры обоими бэкендами.
+
+    :return: Список расхождений (пустой, если AdditionalData совпали).
+    """
+    from .schemas import AdditionalData
+
+    reference = AdditionalData(**SoupBackend().extract_game_details(html))
+    candidate = AdditionalData(**LxmlBackend().extract_game_details(html))
+    if reference != candidate:
+        return [f"details: {reference.model_dump()} != {candidate.model_dump()}"]
+    return []
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Сравнение бэкендов разбора HTML на сохраненных страницах")
+    arg_parser.add_argument("pages", nargs="+", help="HTML-файлы календаря или GameDetails.aspx")
+    arg_parser.add_argument("--active", action="store_true", help="страницы Active-календаря")
+    arg_parser.add_argument("--single", action="store_true", help="одиночные игры (по умолчанию командные)")
+    args = arg_parser.parse_args(argv)
+
+    if not LXML_AVAILABLE:
+        print("lxml не установлен: сравнивать не с чем")
+        return 2
+
+    failed = 0
+    for path in args.pages:
+        with open(path, encoding="utf-8") as file:
+            html = file.read()
+        if GAMES_ROW_ID_PREFIX in html:
+            differences = diff_calendar_page(html, "single" if args.single else "team", args.active)
+        else:
+            differences = diff_game_details(html)
+
+        status = "OK" if not differences else "MISMATCH"
+        print(f"{status} {path}")
+        for difference in differences:
+            print(f"    {difference}")
+        failed += bool(differences)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
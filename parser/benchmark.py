@@ -0,0 +1,171 @@
+"""
+Микро-бенчмарк разбора сохраненных страниц календаря и GameDetails.aspx.
+
+Для каждой страницы из parser/fixtures замеряет стадии отдельно: построение дерева
+HTML, извлечение строк/полей и валидацию pydantic (GameDate, AdditionalData,
+translate_date, extract_limit), а также пиковую память одного прохода. Результат —
+JSON, чтобы прогоны можно было сравнивать между коммитами:
+
+    python -m parser.benchmark [--backend lxml] [--iterations 20] [--output bench.json]
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from logging_config import parser_logger
+from .backends import BACKENDS, DEFAULT_BACKEND, HtmlBackend, get_backend
+from .calendar import build_games_from_rows
+from .dates import parse_calendar_date, parse_details_date
+from .schemas import AdditionalData, EMPTY_FIELD, GameDate, translate_date
+from .utils import extract_limit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Имя файла → (вид страницы, тип игр, Active-календарь)
+FIXTURES: Dict[str, Tuple[str, str, bool]] = {
+    "calendar_coming_small.html": ("calendar", "team", False),
+    "calendar_coming_large.html": ("calendar", "team", False),
+    "calendar_active.html": ("calendar", "team", True),
+    "calendar_malformed.html": ("calendar", "team", False),
+    "details.html": ("details", "team", False),
+    "details_malformed.html": ("details", "team", False),
+}
+
+CALENDAR_DATES = ["17 октября 2026 г. 19:00:00", "1 января 2027 г. 9:05:00", "29 февраля 2028 г. 23:59:59"]
+LIMITS = ["Ограничение: 6", "до 12 человек", "5", EMPTY_FIELD]
+
+
+def _validate_details(details: dict) -> int:
+    """Стадия валидации страницы игры — то же, что делает gather_additional_game_data."""
+    additional_data = AdditionalData(**details)
+    game = GameDate(id=1, domain="kovrov.encounter.cx", start_date=datetime(2026, 1, 1), name="-",
+                    author="-", price="0", game_type="team")
+    extract_limit(additional_data.max_players)
+    if additional_data.end_date != EMPTY_FIELD:
+        game.update_end_date(additional_data.end_date)
+    return 1
+
+
+def _stages(backend: HtmlBackend, html: str, kind: str, game_type: str, is_active: bool) -> List[Tuple[str, Callable]]:
+    """Стадии разбора одной страницы; каждая получает результат предыдущей."""
+    if kind == "calendar":
+        return [
+            ("tree_build", lambda _: backend.calendar_soup(html)),
+            ("extract", backend.calendar_from_soup),
+            ("validate", lambda page: build_games_from_rows(page["rows"], game_type, is_active)),
+        ]
+    return [
+        ("tree_build", lambda _: backend.details_soup(html)),
+        ("extract", backend.details_from_soup),
+        ("validate", _validate_details),
+    ]
+
+
+def _run_once(stages: List[Tuple[str, Callable]], timings: Dict[str, float]):
+    # Каждый проход — холодный: иначе со второй итерации стадия validate мерила бы только lru_cache
+    parse_calendar_date.cache_clear()
+    parse_details_date.cache_clear()
+    value = None
+    for name, stage in stages:
+        started_at = time.perf_counter()
+        value = stage(value)
+        timings[name] += time.perf_counter() - started_at
+    return value
+
+
+def bench_fixture(backend: HtmlBackend, name: str, iterations: int) -> dict:
+    kind, game_type, is_active = FIXTURES[name]
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as file:
+        html = file.read()
+    stages = _stages(backend, html, kind, game_type, is_active)
+
+    # Пиковая память — отдельным проходом: tracemalloc заметно замедляет код
+    gc.collect()
+    tracemalloc.start()
+    result = _run_once(stages, {stage_name: 0.0 for stage_name, _ in stages})
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = {stage_name: 0.0 for stage_name, _ in stages}
+    for _ in range(iterations):
+        _run_once(stages, timings)
+    total = sum(timings.values())
+
+    rows = len(result) if kind == "calendar" else result
+    return {
+        "kind": kind,
+        "bytes": len(html.encode("utf-8")),
+        "rows": rows,
+        "iterations": iterations,
+        "stages_ms": {stage_name: round(seconds / iterations * 1000, 4) for stage_name, seconds in timings.items()},
+        "total_ms": round(total / iterations * 1000, 4),
+        "pages_per_sec": round(iterations / total, 2) if total else None,
+        "rows_per_sec": round(rows * iterations / total, 2) if total else None,
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def bench_function(func: Callable, values: List[str], iterations: int) -> dict:
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        for value in values:
+            func(value)
+    elapsed = time.perf_counter() - started_at
+    calls = iterations * len(values)
+    return {"calls": calls, "us_per_call": round(elapsed / calls * 1e6, 3), "calls_per_sec": round(calls / elapsed, 1)}
+
+
+def _parse_calendar_date(value: str) -> datetime:
+    return datetime.strptime(translate_date(value), "%d %B %Y г. %H:%M:%S")
+
+
+def run(backend_name: Optional[str], iterations: int, fixtures: Optional[List[str]] = None) -> dict:
+    backend = get_backend(backend_name)
+    return {
+        "backend": backend.name,
+        "python": platform.python_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "fixtures": {name: bench_fixture(backend, name, iterations) for name in (fixtures or FIXTURES)},
+        "functions": {
+            "translate_date+strptime": bench_function(_parse_calendar_date, CALENDAR_DATES, iterations * 100),
+            # Без кэша: иначе замер покажет только поиск в lru_cache
+            "parse_calendar_date": bench_function(parse_calendar_date.__wrapped__, CALENDAR_DATES, iterations * 100),
+            "extract_limit": bench_function(extract_limit, LIMITS, iterations * 100),
+            "GameDate": bench_function(
+                lambda value: GameDate(id=1, domain="kovrov.encounter.cx", start_date=value, name="-",
+                                       author="-", price="0", game_type="team"),
+                CALENDAR_DATES, iterations * 10,
+            ),
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк разбора сохраненных страниц encounter")
+    arg_parser.add_argument("--backend", choices=sorted(BACKENDS), default=DEFAULT_BACKEND)
+    arg_parser.add_argument("--iterations", type=int, default=20)
+    arg_parser.add_argument("--fixture", action="append", choices=sorted(FIXTURES), help="только эти страницы")
+    arg_parser.add_argument("--output", help="файл для JSON (по умолчанию stdout)")
+    args = arg_parser.parse_args(argv)
+
+    # Предупреждения о битых строках на каждой итерации только мешают замерам
+    parser_logger.setLevel(logging.ERROR)
+    report = json.dumps(run(args.backend, args.iterations, args.fixture), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(report + "\n")
+    else:
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
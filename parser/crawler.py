@@ -0,0 +1,142 @@
+import asyncio
+import itertools
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+from urllib.parse import urlparse
+
+from logging_config import parser_logger
+
+T = TypeVar("T")
+
+# Значения по умолчанию для обхода страниц GameDetails.aspx
+DEFAULT_PER_HOST_LIMIT = 6
+DEFAULT_RATE = 15.0
+DEFAULT_BURST = 15
+DEFAULT_WORKERS = 24
+DEFAULT_LOG_INTERVAL = 5.0
+
+
+class TokenBucket:
+    """Ограничивает частоту запросов: rate токенов в секунду, не больше capacity подряд."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class HostLimiter:
+    """
+    Ограничивает число одновременных запросов к одному хосту.
+
+    Ключ — хост URL, который запрашивается на самом деле (зеркало), а не исходного URL игры.
+    """
+
+    def __init__(self, limit: int = DEFAULT_PER_HOST_LIMIT):
+        self.limit = limit
+        self._semaphores: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(self.limit))
+
+    def for_url(self, url: str) -> asyncio.Semaphore:
+        return self._semaphores[urlparse(url).netloc]
+
+
+class CrawlScheduler:
+    """
+    Планировщик загрузок для парсера.
+
+    Задачи выполняются в порядке приоритета (меньше — раньше), с ограничением общей
+    частоты запросов (token bucket). Одновременные запросы к одному хосту ограничивает
+    HostLimiter на уровне загрузки конкретного зеркала (см. parser._fetch_once).
+    """
+
+    def __init__(
+            self,
+            rate: float = DEFAULT_RATE,
+            burst: int = DEFAULT_BURST,
+            workers: int = DEFAULT_WORKERS,
+            log_interval: float = DEFAULT_LOG_INTERVAL,
+    ):
+        self.workers = workers
+        self.log_interval = log_interval
+        self.bucket = TokenBucket(rate=rate, capacity=burst)
+        self._counter = itertools.count()
+
+    async def run(
+            self,
+            jobs: Iterable[Tuple[float, str]],
+            fetch: Callable[[str], Awaitable[T]],
+            name: str = "crawl",
+    ) -> List[Optional[T]]:
+        """
+        Выполняет fetch(url) для каждой задачи и возвращает результаты в исходном порядке.
+
+        :param jobs: Пары (приоритет, URL).
+        :param fetch: Корутина загрузки одного URL.
+        :param name: Имя обхода для логов.
+        :return: Список результатов в порядке jobs.
+        """
+        jobs = list(jobs)
+        results: List[Optional[T]] = [None] * len(jobs)
+        if not jobs:
+            return results
+
+        queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        for index, (priority, url) in enumerate(jobs):
+            queue.put_nowait((priority, next(self._counter), index, url))
+
+        stats = {"done": 0, "in_flight": 0}
+        started_at = time.monotonic()
+
+        async def worker() -> None:
+            while True:
+                try:
+                    _, _, index, url = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self.bucket.acquire()
+                stats["in_flight"] += 1
+                try:
+                    results[index] = await fetch(url)
+                except Exception as e:
+                    parser_logger.error(f"[{name}] Ошибка при обработке {url}: {e}")
+                finally:
+                    stats["in_flight"] -= 1
+                    stats["done"] += 1
+
+        async def reporter() -> None:
+            while True:
+                await asyncio.sleep(self.log_interval)
+                elapsed = time.monotonic() - started_at
+                parser_logger.info(
+                    f"[{name}] Прогресс: {stats['done']}/{len(jobs)}, в очереди={queue.qsize()}, "
+                    f"в работе={stats['in_flight']}, скорость={stats['done'] / elapsed:.1f} стр/с"
+                )
+
+        reporter_task = asyncio.create_task(reporter())
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.workers, len(jobs)))))
+        finally:
+            reporter_task.cancel()
+
+        elapsed = time.monotonic() - started_at
+        parser_logger.info(
+            f"[{name}] Завершено: {stats['done']} запросов за {elapsed:.1f} с "
+            f"({stats['done'] / elapsed if elapsed else 0:.1f} стр/с)"
+        )
+        return results
@@ -0,0 +1,155 @@
+"""
+Разбор дат encounter без strptime.
+
+Календарь отдает даты вида '17 октября 2026 г. 19:00:00', страница игры —
+'25.10.2026 21:00:00'. Раньше строка календаря проходила через translate_date
+(12 замен) и strptime с локалезависимым %B; здесь одна заранее скомпилированная
+регулярка, таблица месяцев и прямое построение datetime, а повторяющиеся строки
+запоминаются на весь обход.
+
+Шаблоны чисел повторяют те, что strptime использует для %d/%m/%Y/%H/%M/%S, поэтому
+результат (и ошибки) совпадают со старым разбором. Проверка на страницах из
+parser/fixtures и сгенерированных вариантах:
+
+    python -m parser.dates
+"""
+import calendar
+import itertools
+import os
+import re
+import sys
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional
+
+MONTHS = {
+    "января": 1,
+    "февраля": 2,
+    "марта": 3,
+    "апреля": 4,
+    "мая": 5,
+    "июня": 6,
+    "июля": 7,
+    "августа": 8,
+    "сентября": 9,
+    "октября": 10,
+    "ноября": 11,
+    "декабря": 12,
+}
+# strptime после translate_date принимал и английские названия без учета регистра
+ENGLISH_MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+
+# Те же шаблоны, что у strptime для %d, %m, %Y, %H, %M, %S; пробел формата — \s+
+_DAY = r"(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])"
+_MONTH = r"(1[0-2]|0[1-9]|[1-9])"
+_YEAR = r"(\d\d\d\d)"
+_TIME = r"(2[0-3]|[0-1]\d|\d):([0-5]\d|\d):(6[0-1]|[0-5]\d|\d)"
+
+CALENDAR_DATE_RE = re.compile(rf"{_DAY}\s+(\w+)\s+{_YEAR}\s+г\.\s+{_TIME}", re.IGNORECASE)
+DETAILS_DATE_RE = re.compile(rf"{_DAY}\.{_MONTH}\.{_YEAR}\s+{_TIME}", re.IGNORECASE)
+
+DATE_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_calendar_date(value: str) -> datetime:
+    """
+    Разбирает дату календаря: '17 октября 2026 г. 19:00:00'.
+
+    :param value: Текст ячейки.
+    :return: datetime без часового пояса.
+    :raises ValueError: Если строка не в формате календаря или дата не существует.
+    """
+    match = CALENDAR_DATE_RE.fullmatch(value)
+    if match is None:
+        raise ValueError(f"time data {value!r} does not match calendar date format")
+    day, month_name, year, hour, minute, second = match.groups()
+    month = MONTHS.get(month_name) or ENGLISH_MONTHS.get(month_name.lower())
+    if month is None:
+        raise ValueError(f"unknown month {month_name!r} in {value!r}")
+    return datetime(int(year), month, int(day), int(hour), int(minute), int(second))
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_details_date(value: str) -> datetime:
+    """
+    Разбирает дату со страницы игры: '25.10.2026 21:00:00'.
+
+    :param value: Текст даты.
+    :return: datetime без часового пояса.
+    :raises ValueError: Если строка не в формате страницы игры или дата не существует.
+    """
+    match = DETAILS_DATE_RE.fullmatch(value)
+    if match is None:
+        raise ValueError(f"time data {value!r} does not match details date format")
+    day, month, year, hour, minute, second = match.groups()
+    return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+
+
+def _reference_calendar_date(value: str) -> datetime:
+    from .schemas import translate_date
+    return datetime.strptime(translate_date(value), "%d %B %Y г. %H:%M:%S")
+
+
+def _reference_details_date(value: str) -> datetime:
+    return datetime.strptime(value, "%d.%m.%Y %H:%M:%S")
+
+
+def _outcome(func: Callable[[str], datetime], value: str):
+    try:
+        return func(value)
+    except ValueError:
+        return ValueError
+
+
+def compare(values: Iterable[str], func: Callable[[str], datetime], reference: Callable[[str], datetime]) -> List[str]:
+    """Возвращает строки, на которых func и старый разбор дают разный результат."""
+    return [value for value in values if _outcome(func, value) != _outcome(reference, value)]
+
+
+def _fixture_dates(fixtures_dir: str) -> List[str]:
+    from .backends import SoupBackend
+
+    values = []
+    for name in sorted(os.listdir(fixtures_dir)):
+        with open(os.path.join(fixtures_dir, name), encoding="utf-8") as file:
+            html = file.read()
+        if name.startswith("calendar"):
+            for row in SoupBackend().extract_calendar_page(html)["rows"]:
+                values.extend(row[4:6])
+        else:
+            end_date = SoupBackend().extract_game_details(html).get("end_date")
+            if end_date:
+                values.append(end_date)
+    return values
+
+
+def _generated_dates() -> Iterable[str]:
+    months = list(MONTHS) + ["January", "MAY", "Октября", "мая"]
+    for day, month, year, time in itertools.product(
+            ["1", "01", "9", " 9", "29", "31", "32", "0"],
+            months,
+            ["2026", "2028", "26"],
+            ["0:00:00", "9:5:7", "23:59:59", "24:00:00", "12:60:00", "12:00:60"],
+    ):
+        yield f"{day} {month} {year} г. {time}"
+        yield f"{day}  {month}\t{year} Г. {time}"
+        yield f"{day} {month} {year} г. {time} "
+        yield f"{day}.{MONTHS.get(month, 1)}.{year} {time}"
+        yield f"{day}.{MONTHS.get(month, 1):02d}.{year}  {time}"
+
+
+def main(fixtures_dir: Optional[str] = None) -> int:
+    fixtures_dir = fixtures_dir or os.path.join(os.path.dirname(__file__), "fixtures")
+    values = _fixture_dates(fixtures_dir) + list(_generated_dates())
+
+    mismatches = compare(values, parse_calendar_date, _reference_calendar_date)
+    mismatches += compare(values, parse_details_date, _reference_details_date)
+    print(f"Проверено строк: {len(values)}, расхождений: {len(mismatches)}")
+    for value in mismatches:
+        print(f"    {value!r}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
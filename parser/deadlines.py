@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pytz
+
+from logging_config import parser_logger
+
+# (до ближайшего старта/окончания не больше, проверять страницу игры раз в)
+REFRESH_STEPS: Tuple[Tuple[timedelta, timedelta], ...] = (
+    (timedelta(hours=1), timedelta(minutes=5)),
+    (timedelta(hours=6), timedelta(minutes=15)),
+    (timedelta(days=1), timedelta(minutes=30)),
+    (timedelta(days=3), timedelta(hours=1)),
+    (timedelta(days=14), timedelta(hours=3)),
+)
+MAX_REFRESH_INTERVAL = timedelta(hours=6)
+
+
+def moscow_now() -> datetime:
+    """Текущее время по Москве без tzinfo — в таком виде даты игр хранятся в БД."""
+    return datetime.now(pytz.timezone("Europe/Moscow")).replace(tzinfo=None)
+
+
+def next_deadline(start_date: datetime, end_date: Optional[datetime], now: datetime) -> Optional[datetime]:
+    """Ближайшее будущее событие игры: старт или окончание; None, если оба в прошлом."""
+    for moment in (start_date, end_date):
+        if moment is not None and moment > now:
+            return moment
+    return None
+
+
+def refresh_interval(start_date: datetime, end_date: Optional[datetime], now: datetime) -> timedelta:
+    """
+    Как часто перепроверять страницу игры: чем ближе старт или окончание, тем чаще.
+
+    :param start_date: Начало игры.
+    :param end_date: Окончание игры или None.
+    :param now: Текущее время (московское, без tzinfo).
+    :return: Интервал между проверками.
+    """
+    deadline = next_deadline(start_date, end_date, now)
+    if deadline is None:
+        # Игра уже должна была закончиться — проверяем часто, пока календарь ее не уберет
+        return REFRESH_STEPS[0][1]
+    remaining = deadline - now
+    for horizon, interval in REFRESH_STEPS:
+        if remaining <= horizon:
+            return interval
+    return MAX_REFRESH_INTERVAL
+
+
+class DeadlineTracker:
+    """
+    Помнит, когда страница каждой игры проверялась в последний раз, и решает,
+    пора ли проверять ее снова (см. refresh_interval).
+
+    Игры, которые еще не проверялись в этом процессе, считаются просроченными.
+    """
+
+    def __init__(self):
+        self.checked_at: Dict[int, datetime] = {}
+        self.due_count = 0
+        self.skipped_count = 0
+
+    def is_due(self, game, now: datetime) -> bool:
+        checked_at = self.checked_at.get(game.id)
+        if checked_at is None:
+            return True
+        return now - checked_at >= refresh_interval(game.start_date, game.end_date, now)
+
+    def take(self, game, now: datetime) -> bool:
+        """То же, что is_due, но с учетом в счетчиках проверенных/пропущенных."""
+        if self.is_due(game, now):
+            self.due_count += 1
+            return True
+        self.skipped_count += 1
+        return False
+
+    def split(self, games: Iterable, now: datetime) -> Tuple[List, List]:
+        """Делит игры на (пора проверять, можно пропустить)."""
+        due, skipped = [], []
+        for game in games:
+            (due if self.take(game, now) else skipped).append(game)
+        return due, skipped
+
+    def mark_checked(self, game_id: int, now: datetime) -> None:
+        self.checked_at[game_id] = now
+
+    def forget(self, game_ids: Iterable[int]) -> None:
+        for game_id in game_ids:
+            self.checked_at.pop(game_id, None)
+
+    def log_stats(self) -> None:
+        parser_logger.info(
+            f"Планирование по срокам: проверено страниц игр={self.due_count}, "
+            f"пропущено (не подошел срок)={self.skipped_count}, отслеживается игр={len(self.checked_at)}"
+        )
+
+
+deadline_tracker = DeadlineTracker()
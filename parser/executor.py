@@ -0,0 +1,48 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Optional, TypeVar
+
+from logging_config import parser_logger
+
+T = TypeVar("T")
+
+
+class ParsingExecutor:
+    """
+    Пул процессов для разбора HTML.
+
+    BeautifulSoup работает синхронно и на сотне страниц надолго занимает event loop,
+    на котором крутится и polling бота. Поэтому разбор уходит в отдельные процессы,
+    а в loop возвращаются уже простые данные.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: дочерние процессы не наследуют потоки и event loop бота
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            parser_logger.info(f"Пул парсинга запущен: процессов={self.max_workers}")
+        return self._pool
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Выполняет func(*args, **kwargs) в пуле процессов."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pool(), partial(func, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            parser_logger.info("Пул парсинга остановлен")
+
+
+parsing_executor = ParsingExecutor()
@@ -0,0 +1,45 @@
+"""
+Синхронное извлечение данных из HTML.
+
+Функции модуля выполняются в пуле процессов (см. parser.executor), поэтому принимают
+строки HTML и возвращают простые списки/словари. Сами они зависят только от bs4/lxml
+(через parser.backends), но рабочий процесс запускается через spawn и при старте заново
+импортирует главный модуль (main.py со всеми его зависимостями) и пакет parser —
+легковесным процесс от этого не становится, экономится только передача данных.
+"""
+from typing import List, Optional
+
+from .backends import get_backend
+
+
+def extract_calendar_page(html: str, backend: Optional[str] = None) -> dict:
+    """
+    Извлекает строки игр и ссылки пагинации из страницы календаря.
+
+    :param html: Текст HTML.
+    :param backend: Имя бэкенда разбора (по умолчанию html.parser).
+    :return: {"rows": [[текст ячеек строки], ...], "pagination": [ссылки]}
+    """
+    return get_backend(backend).extract_calendar_page(html)
+
+
+def extract_game_details(html: Optional[str], backend: Optional[str] = None) -> dict:
+    """
+    Извлекает обложку, лимит игроков и дату окончания со страницы GameDetails.aspx.
+
+    :param html: Текст HTML или None.
+    :param backend: Имя бэкенда разбора (по умолчанию html.parser).
+    :return: Словарь с ключами image, max_players, end_date (отсутствующие не включаются).
+    """
+    return get_backend(backend).extract_game_details(html)
+
+
+def extract_pagination_links(html: str, backend: Optional[str] = None) -> List[str]:
+    """
+        Извлекает ссылки пагинации из HTML.
+
+        :param html: Текст HTML.
+        :param backend: Имя бэкенда разбора.
+        :return: Список ссылок.
+    """
+    return extract_calendar_page(html, backend)["pagination"]
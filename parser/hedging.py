@@ -0,0 +1,94 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from logging_config import parser_logger
+
+T = TypeVar("T")
+
+DEFAULT_HEDGE_DELAY = 3.0
+DEFAULT_HEDGE_BUDGET = 0.1
+
+
+class HedgeBudget:
+    """Ограничивает дополнительную нагрузку: хеджей не больше ratio от числа основных запросов."""
+
+    def __init__(self, ratio: float = DEFAULT_HEDGE_BUDGET):
+        self.ratio = ratio
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record_request(self) -> None:
+        self.requests += 1
+
+    def try_acquire(self) -> bool:
+        if self.hedges + 1 > self.ratio * self.requests:
+            return False
+        self.hedges += 1
+        return True
+
+    def log_stats(self) -> None:
+        parser_logger.info(
+            f"Хеджирование: запросов={self.requests}, хеджей={self.hedges} "
+            f"({self.hedges / self.requests if self.requests else 0:.1%}), выиграли={self.hedge_wins}"
+        )
+
+
+async def hedged_request(
+        attempts: List[str],
+        fetch_once: Callable[[str], Awaitable[T]],
+        delay: float,
+        budget: HedgeBudget,
+) -> Tuple[Optional[T], bool]:
+    """
+    Выполняет запрос с хеджированием по зеркалам.
+
+    Если первое зеркало не ответило за delay секунд и бюджет позволяет, тот же запрос уходит
+    на следующее зеркало; побеждает первый успешный ответ, остальные запросы отменяются.
+    При ошибке зеркала сразу пробуется следующее, как и без хеджирования.
+
+    :param attempts: URL зеркал в порядке попыток.
+    :param fetch_once: Корутина одной попытки; при ошибке бросает исключение.
+    :param delay: Через сколько секунд без ответа отправлять хедж.
+    :param budget: Общий бюджет хеджей.
+    :return: (Результат или None, был ли фейл всех попыток)
+    """
+    budget.record_request()
+    remaining = list(attempts)
+    pending = set()
+    hedged_tasks = set()
+
+    def launch() -> asyncio.Task:
+        task = asyncio.create_task(fetch_once(remaining.pop(0)))
+        pending.add(task)
+        return task
+
+    launch()
+    try:
+        while pending:
+            timeout = delay if remaining else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                if budget.try_acquire():
+                    hedged_tasks.add(launch())
+                else:
+                    # Бюджет исчерпан — просто ждем уже отправленные запросы
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    continue
+
+            for task in done:
+                pending.discard(task)
+                if task.exception() is None:
+                    if task in hedged_tasks:
+                        budget.hedge_wins += 1
+                    return task.result(), False
+
+            if not pending and remaining:
+                launch()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    return None, True
@@ -0,0 +1,121 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from typing import Optional, Set
+
+import aiofiles
+
+from logging_config import parser_logger
+
+HTTP_CACHE_DIR = "cache/http"
+# Записи старше этого срока удаляются при очистке, даже если игра еще в календаре
+HTTP_CACHE_MAX_AGE_DAYS = 30
+CACHE_ENTRY_SUFFIX = ".json.gz"
+
+
+def content_hash(body: str) -> str:
+    """Хэш тела ответа — запасной валидатор, если зеркало не отдает ETag/Last-Modified."""
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class HttpCache:
+    """
+    Дисковый кэш HTTP-ответов с условными запросами.
+
+    Для каждого URL хранит ETag, Last-Modified, хэш тела и уже распарсенные данные,
+    чтобы при 304 или неизменном теле не парсить страницу повторно. Само тело не хранится.
+    """
+
+    def __init__(self, cache_dir: str = HTTP_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        # Имена файлов записей, к которым обращались через этот экземпляр (см. prune)
+        self.used: Set[str] = set()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest() + CACHE_ENTRY_SUFFIX
+        self.used.add(name)
+        return os.path.join(self.cache_dir, name)
+
+    async def load(self, url: str) -> Optional[dict]:
+        path = self._path(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            async with aiofiles.open(path, "rb") as file:
+                return json.loads(gzip.decompress(await file.read()))
+        except Exception as e:
+            parser_logger.warning(f"Повреждена запись HTTP-кэша для {url}: {e}")
+            return None
+
+    async def save(self, url: str, body: str, headers: dict, data: dict) -> None:
+        headers = {key.lower(): value for key, value in headers.items()}
+        entry = {
+            "url": url,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "body_hash": content_hash(body),
+            "data": data,
+        }
+        path = self._path(url)
+        tmp_path = path + ".tmp"
+        async with aiofiles.open(tmp_path, "wb") as file:
+            await file.write(gzip.compress(json.dumps(entry, ensure_ascii=False).encode("utf-8")))
+        os.replace(tmp_path, path)
+
+    def prune(self, max_age_days: int = HTTP_CACHE_MAX_AGE_DAYS, drop_unused: bool = False) -> int:
+        """
+        Удаляет устаревшие записи.
+
+        :param max_age_days: Записи, не перезаписанные дольше этого срока, удаляются.
+        :param drop_unused: Удалять и записи, к которым этот экземпляр не обращался, — после
+            полного обхода без ошибок это игры, которых больше нет ни в одном календаре.
+        :return: Сколько записей удалено.
+        """
+        expired_before = time.time() - max_age_days * 24 * 3600
+        removed = 0
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(CACHE_ENTRY_SUFFIX):
+                    continue
+                try:
+                    if (drop_unused and entry.name not in self.used) or entry.stat().st_mtime < expired_before:
+                        os.remove(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        if removed:
+            parser_logger.info(f"HTTP-кэш: удалено устаревших записей={removed}")
+        return removed
+
+    @staticmethod
+    def request_headers(entry: Optional[dict]) -> dict:
+        """Заголовки условного запроса для сохраненной записи."""
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def is_unchanged(self, entry: Optional[dict], status: int, body: Optional[str]) -> bool:
+        """Проверяет, можно ли использовать сохраненные данные вместо нового парсинга."""
+        unchanged = entry is not None and (
+                status == 304 or (body is not None and content_hash(body) == entry.get("body_hash"))
+        )
+        if unchanged:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return unchanged
+
+    def log_stats(self, name: str) -> None:
+        total = self.hits + self.misses
+        ratio = self.hits / total * 100 if total else 0
+        parser_logger.info(f"[{name}] HTTP-кэш: попаданий={self.hits}, промахов={self.misses} ({ratio:.0f}% попаданий)")
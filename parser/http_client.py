@@ -0,0 +1,81 @@
+from typing import Optional
+
+import aiohttp
+
+from logging_config import parser_logger
+from .replay import HTTP_CORPUS_DIR, HttpCorpus, RecordingSession, ReplayProfile, ReplaySession
+
+try:
+    import brotli  # noqa: F401  aiohttp сам распаковывает br, если пакет установлен
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+MAX_CONNECTIONS = 150
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+REQUEST_TIMEOUT = 300
+
+
+class HttpClient:
+    """
+    Общая для всего процесса aiohttp-сессия.
+
+    Один пул соединений с keep-alive и кэшем DNS используется загрузчиком календарей,
+    страниц игр и изображений, чтобы не платить за новое TCP/TLS-соединение на каждый запрос.
+
+    В режиме record ответы дополнительно пишутся в корпус, в режиме replay сеть
+    не используется вовсе (см. parser.replay).
+    """
+
+    def __init__(
+            self,
+            max_connections: int = MAX_CONNECTIONS,
+            dns_cache_ttl: int = DNS_CACHE_TTL,
+            keepalive_timeout: int = KEEPALIVE_TIMEOUT,
+            timeout: int = REQUEST_TIMEOUT,
+            mode: str = "live",
+            corpus_dir: str = HTTP_CORPUS_DIR,
+            replay_profile: Optional[ReplayProfile] = None,
+    ):
+        self.max_connections = max_connections
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.mode = mode
+        self.corpus_dir = corpus_dir
+        self.replay_profile = replay_profile
+        self._session = None
+
+    async def start(self) -> aiohttp.ClientSession:
+        """Возвращает открытую сессию, создавая ее при первом вызове."""
+        if self.mode == "replay":
+            if self._session is None or self._session.closed:
+                self._session = ReplaySession(HttpCorpus(self.corpus_dir), self.replay_profile)
+                parser_logger.info(f"HTTP-клиент в режиме replay (корпус: {self.corpus_dir})")
+            return self._session
+
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                ssl=False,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Accept-Encoding": ACCEPT_ENCODING},
+            )
+            parser_logger.info(f"HTTP-клиент запущен (соединений={self.max_connections}, Accept-Encoding: {ACCEPT_ENCODING})")
+            if self.mode == "record":
+                self._session = RecordingSession(self._session, HttpCorpus(self.corpus_dir))
+                parser_logger.info(f"HTTP-клиент записывает ответы в корпус {self.corpus_dir}")
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            parser_logger.info("HTTP-клиент остановлен")
+        self._session = None
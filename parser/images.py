@@ -0,0 +1,104 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import aiofiles
+import aiohttp
+
+from logging_config import parser_logger
+
+IMAGES_DIR = "images"
+# Сколько обложек скачивается одновременно
+IMAGE_CONCURRENCY = 8
+CHUNK_SIZE = 64 * 1024
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+DEFAULT_EXTENSION = ".jpg"
+
+
+def image_extension(image_url: str) -> str:
+    """Расширение файла по пути URL; для неизвестных — .jpg."""
+    extension = os.path.splitext(urlparse(image_url).path)[1].lower()
+    return extension if extension in IMAGE_EXTENSIONS else DEFAULT_EXTENSION
+
+
+async def store_image(image_url: str, save_dir: str = IMAGES_DIR) -> Optional[str]:
+    """
+    Скачивает изображение потоком и сохраняет его под именем хэша содержимого.
+
+    Тело пишется частями во временный файл и атомарно переименовывается, поэтому
+    читатели никогда не видят недописанный файл. Если файл с таким хэшем уже есть
+    (одна обложка у нескольких игр), временный файл удаляется.
+
+    :param image_url: URL изображения.
+    :param save_dir: Каталог для изображений.
+    :return: Путь к файлу или None при ошибке.
+    """
+    if not image_url or not image_url.startswith(("http://", "https://")):
+        parser_logger.info(f"❌ Ошибка: Неверный URL -> {image_url}")
+        return None
+
+    os.makedirs(save_dir, exist_ok=True)
+    tmp_path = os.path.join(save_dir, f".{uuid.uuid4().hex}.part")
+
+    from loader import http_client
+    session = await http_client.start()
+
+    try:
+        async with session.get(image_url) as response:
+            if response.status != 200:
+                parser_logger.info(f"❌ Ошибка загрузки: HTTP {response.status} для {image_url}")
+                return None
+
+            digest = hashlib.sha256()
+            async with aiofiles.open(tmp_path, "wb") as file:
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    digest.update(chunk)
+                    await file.write(chunk)
+
+        file_path = os.path.join(save_dir, digest.hexdigest() + image_extension(image_url))
+        if os.path.exists(file_path):
+            os.remove(tmp_path)
+            parser_logger.info(f"✅ Изображение уже есть: {file_path}")
+        else:
+            os.replace(tmp_path, file_path)
+            parser_logger.info(f"✅ Изображение сохранено: {file_path}")
+        return file_path
+    except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+        parser_logger.info(f"⚠️ Ошибка при загрузке {image_url}: {e}")
+        return None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+async def fetch_images(
+        image_urls: Dict[int, str],
+        concurrency: int = IMAGE_CONCURRENCY,
+        save_dir: str = IMAGES_DIR,
+) -> Dict[int, Optional[str]]:
+    """
+    Скачивает обложки нескольких игр параллельно, не больше concurrency одновременно.
+    Одинаковый URL у нескольких игр скачивается один раз.
+
+    :param image_urls: id игры → URL обложки.
+    :param concurrency: Ограничение одновременных загрузок.
+    :param save_dir: Каталог для изображений.
+    :return: id игры → путь к файлу или None, если загрузить не удалось.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    unique_urls = sorted(set(image_urls.values()))
+
+    async def fetch(url: str) -> Optional[str]:
+        async with semaphore:
+            return await store_image(url, save_dir)
+
+    paths = dict(zip(unique_urls, await asyncio.gather(*(fetch(url) for url in unique_urls))))
+    if unique_urls:
+        parser_logger.info(
+            f"Обложки: игр={len(image_urls)}, уникальных URL={len(unique_urls)}, "
+            f"скачано={sum(path is not None for path in paths.values())}"
+        )
+    return {game_id: paths[url] for game_id, url in image_urls.items()}
@@ -0,0 +1,134 @@
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from logging_config import parser_logger
+
+# Зеркала encounter; хост игры kovrov.encounter.cx доступен и как kovrov.en.cx / kovrov.encounter.ru
+MIRROR_SUFFIXES = (".encounter.cx", ".en.cx", ".encounter.ru")
+
+EWMA_ALPHA = 0.3
+FAILURE_THRESHOLD = 3
+COOLDOWN_SECONDS = 300
+# Во сколько раз ошибки "удлиняют" задержку зеркала при сортировке
+ERROR_PENALTY = 4
+# Сколько последних задержек хранить для расчета перцентилей
+LATENCY_SAMPLES = 200
+
+
+def mirror_key(url: str) -> str:
+    """Ключ зеркала: суффикс домена encounter или хост целиком для прочих адресов."""
+    host = urlparse(url).netloc
+    for suffix in MIRROR_SUFFIXES:
+        if host.endswith(suffix):
+            return suffix.lstrip(".")
+    return host
+
+
+class MirrorStats:
+    """Состояние одного зеркала: EWMA задержки и доли ошибок, время последнего сбоя."""
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_failure: Optional[float] = None
+        self.tripped_until = 0.0
+
+    def is_tripped(self, now: float) -> bool:
+        return self.tripped_until > now
+
+    def score(self) -> float:
+        if self.latency is None:
+            return float("inf")
+        return self.latency * (1 + ERROR_PENALTY * self.error_rate)
+
+
+class MirrorHealth:
+    """
+    Учет здоровья зеркал для загрузчика.
+
+    Запросы сначала уходят на зеркало с наименьшей задержкой и долей ошибок. Зеркало,
+    которое падает FAILURE_THRESHOLD раз подряд, отключается на COOLDOWN_SECONDS.
+    """
+
+    def __init__(
+            self,
+            alpha: float = EWMA_ALPHA,
+            failure_threshold: int = FAILURE_THRESHOLD,
+            cooldown: float = COOLDOWN_SECONDS,
+    ):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.stats: Dict[str, MirrorStats] = {}
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def _get(self, url: str) -> MirrorStats:
+        return self.stats.setdefault(mirror_key(url), MirrorStats())
+
+    def order(self, urls: List[str]) -> List[str]:
+        """
+        Сортирует варианты URL: сначала рабочие зеркала по качеству, отключенные — в конце.
+        Неизвестные зеркала сохраняют исходный порядок.
+        """
+        now = time.monotonic()
+
+        def sort_key(item):
+            index, url = item
+            stats = self.stats.get(mirror_key(url))
+            if stats is None:
+                return 0, float("inf"), index
+            if stats.is_tripped(now):
+                return 1, stats.tripped_until, index
+            return 0, stats.score(), index
+
+        return [url for _, url in sorted(enumerate(urls), key=sort_key)]
+
+    def latency_percentile(self, percentile: float, min_samples: int = 20) -> Optional[float]:
+        """Перцентиль задержки успешных ответов по всем зеркалам или None, если данных мало."""
+        if len(self.latencies) < min_samples:
+            return None
+        samples = sorted(self.latencies)
+        return samples[min(len(samples) - 1, int(percentile * len(samples)))]
+
+    def record_success(self, url: str, latency: float) -> None:
+        stats = self._get(url)
+        self.latencies.append(latency)
+        stats.requests += 1
+        stats.consecutive_failures = 0
+        stats.tripped_until = 0.0
+        stats.latency = latency if stats.latency is None else self.alpha * latency + (1 - self.alpha) * stats.latency
+        stats.error_rate = (1 - self.alpha) * stats.error_rate
+
+    def record_failure(self, url: str) -> None:
+        stats = self._get(url)
+        now = time.monotonic()
+        stats.requests += 1
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        stats.last_failure = now
+        stats.error_rate = self.alpha + (1 - self.alpha) * stats.error_rate
+        if stats.consecutive_failures >= self.failure_threshold and not stats.is_tripped(now):
+            stats.tripped_until = now + self.cooldown
+            parser_logger.warning(
+                f"Зеркало {mirror_key(url)} отключено на {self.cooldown:.0f} с "
+                f"после {stats.consecutive_failures} ошибок подряд"
+            )
+
+    def log_stats(self) -> None:
+        now = time.monotonic()
+        for key, stats in sorted(self.stats.items(), key=lambda item: item[1].score()):
+            latency = f"{stats.latency * 1000:.0f} мс" if stats.latency is not None else "—"
+            last_failure = f"{now - stats.last_failure:.0f} с назад" if stats.last_failure else "—"
+            state = "отключено" if stats.is_tripped(now) else "доступно"
+            parser_logger.info(
+                f"Зеркало {key}: {state}, задержка(EWMA)={latency}, ошибки(EWMA)={stats.error_rate:.0%}, "
+                f"запросов={stats.requests}, сбоев={stats.failures}, последний сбой={last_failure}"
+            )
+
+
+mirror_health = MirrorHealth()
@@ -1,18 +1,32 @@
 from typing import Optional, List
 import aiohttp
 import asyncio
-import re
-from datetime import datetime
+import time
 from urllib.parse import urlparse, urlunparse
-from bs4 import BeautifulSoup
 from sqlalchemy import update, delete
 from typing import List, Optional, Tuple
 
 from db.models import GameState, GameDate as GameModel, UserGameSubscription, UserGameRole
-from loader import game_dao
-from .schemas import GameDate, AdditionalData, translate_date, EMPTY_FIELD
-from .utils import extract_limit, download_image
+from db.dao.subs import role_count_cache
+from db.utils import update_game_states
+from loader import game_dao, http_client
+from .schemas import GameDate, AdditionalData, CrawlResult, EMPTY_FIELD
+from .utils import extract_limit
+from .images import fetch_images
+from .pipeline import CrawlPipeline, build_game_row, needs_cover_download
+from .crawler import CrawlScheduler, HostLimiter
+from .http_cache import HttpCache
+from .calendar import build_games_from_rows
+from .backends import diff_calendar_page, diff_game_details
+from .executor import parsing_executor
+from .mirrors import mirror_health
+from .snapshot import CrawlSnapshot, SnapshotDiff, LIVE_STATES
+from .deadlines import deadline_tracker, moscow_now
+from .probe import change_probe
+from .hedging import HedgeBudget, hedged_request, DEFAULT_HEDGE_DELAY
+from .extract import extract_calendar_page, extract_game_details
 from logging_config import parser_logger
+from settings import settings
 
 GAMES_URLS = [
     ("https://kovrov.encounter.cx/GameCalendar.aspx?status=Coming&type=Team&zone=Virtual", "team"),
@@ -25,16 +39,36 @@ ACTIVE_GAMES_URLS = [
     ("https://kovrov.encounter.cx/GameCalendar.aspx?status=Active&type=Single&zone=Virtual", "single")
 ]
 
+# (URL, тип игр, Active-календарь) для каждого календаря обхода
+CALENDARS = [(url, game_type, False) for url, game_type in GAMES_URLS]
+CALENDARS += [(url, game_type, True) for url, game_type in ACTIVE_GAMES_URLS]
+
 DEFAULT_HEADERS = {
     "User-Agent": "Mozilla/5.0",
     "Accept": "text/html",
     "Accept-Language": "en-US",
 }
 
+# Бюджет хеджированных запросов на весь процесс (см. PARSER_HEDGING)
+hedge_budget = HedgeBudget(ratio=settings.PARSER_HEDGE_BUDGET)
+
+# Одновременные запросы к каждому зеркалу на весь процесс: календари, страницы игр, хеджирование
+host_limiter = HostLimiter()
+
+# Обход календаря и обновление страниц по срокам не должны пересекаться
+crawl_lock = asyncio.Lock()
+
 
 def _build_mirror_urls(url: str) -> List[str]:
-    """Возвращает список URL с зеркалами в порядке попыток."""
+    """
+        Возвращает список URL с зеркалами в порядке по умолчанию (см. MirrorHealth.order).
+        Если задан PARSER_SITE_URL (локальный стенд, см. parser.standin), единственный вариант — стенд.
+    """
     parsed = urlparse(url)
+    if settings.PARSER_SITE_URL:
+        site = urlparse(settings.PARSER_SITE_URL)
+        return [urlunparse(parsed._replace(scheme=site.scheme, netloc=site.netloc))]
+
     host = parsed.netloc
     mirrors = [host]
 
@@ -51,39 +85,94 @@ def _build_mirror_urls(url: str) -> List[str]:
     return [urlunparse(parsed._replace(netloc=h)) for h in unique_hosts]
 
 
-async def fetch_html(session: aiohttp.ClientSession, url: str, headers: Optional[dict] = None) -> Tuple[Optional[str], bool]:
+async def _fetch_once(session: aiohttp.ClientSession, url: str, headers: dict) -> Tuple[int, str, dict]:
     """
-        Асинхронно получает HTML-страницу по заданному URL с попытками через зеркала.
+        Одна попытка загрузки с одного зеркала под ограничением одновременных запросов к нему;
+        обновляет статистику зеркал, при ошибке бросает исключение.
+    """
+    async with host_limiter.for_url(url):
+        started_at = time.monotonic()
+        try:
+            async with session.get(url, headers=headers) as response:
+                response.raise_for_status()
+                result = (response.status, await response.text(), dict(response.headers))
+        except Exception as e:
+            mirror_health.record_failure(url)
+            parser_logger.error(f"Ошибка при загрузке {url}: {e}")
+            raise
+    mirror_health.record_success(url, time.monotonic() - started_at)
+    return result
+
+
+async def fetch_response(
+        session: aiohttp.ClientSession, url: str, headers: Optional[dict] = None
+) -> Tuple[Optional[Tuple[int, str, dict]], bool]:
+    """
+        Асинхронно выполняет GET-запрос по заданному URL с попытками через зеркала.
 
         :param session: Объект aiohttp.ClientSession.
         :param url: URL для загрузки.
         :param headers: HTTP-заголовки запроса.
-        :return: (Текст HTML или None при ошибке, был ли фейл всех попыток)
+        :return: ((статус, текст, заголовки ответа) или None при ошибке, был ли фейл всех попыток)
     """
     headers = headers or DEFAULT_HEADERS
-    attempts = _build_mirror_urls(url)
+    attempts = mirror_health.order(_build_mirror_urls(url))
+
+    if settings.PARSER_HEDGING and len(attempts) > 1:
+        delay = mirror_health.latency_percentile(settings.PARSER_HEDGE_PERCENTILE) or DEFAULT_HEDGE_DELAY
+        return await hedged_request(
+            attempts,
+            lambda attempt_url: _fetch_once(session, attempt_url, headers),
+            delay=delay,
+            budget=hedge_budget,
+        )
 
     for attempt_url in attempts:
         try:
-            async with session.get(attempt_url, headers=headers) as response:
-                response.raise_for_status()
-                return await response.text(), False
-        except Exception as e:
-            parser_logger.error(f"Ошибка при загрузке {attempt_url}: {e}")
+            return await _fetch_once(session, attempt_url, headers), False
+        except Exception:
+            continue
 
     return None, True
 
 
-def extract_pagination_links(html: str) -> List[str]:
+def log_fetch_stats() -> None:
+    """Логирует статистику зеркал и хеджирования по итогам обхода."""
+    mirror_health.log_stats()
+    if settings.PARSER_HEDGING:
+        hedge_budget.log_stats()
+
+
+async def fetch_html(session: aiohttp.ClientSession, url: str, headers: Optional[dict] = None) -> Tuple[Optional[str], bool]:
+    """
+        Асинхронно получает HTML-страницу по заданному URL с попытками через зеркала.
+
+        :param session: Объект aiohttp.ClientSession.
+        :param url: URL для загрузки.
+        :param headers: HTTP-заголовки запроса.
+        :return: (Текст HTML или None при ошибке, был ли фейл всех попыток)
+    """
+    response, failed = await fetch_response(session, url, headers)
+    return (response[1] if response else None), failed
+
+
+async def parse_calendar_page(html: str, game_type: str, is_active: bool = False) -> Tuple[List[GameDate], List[str]]:
     """
-        Извлекает ссылки пагинации из HTML.
+        Парсит страницу календаря: HTML разбирается в пуле процессов, GameDate собираются в event loop.
 
         :param html: Текст HTML.
-        :return: Список ссылок.
+        :param game_type: Тип игры (team или single).
+        :param is_active: True для Active-календаря.
+        :return: Список объектов GameDate и ссылки пагинации.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    pagination_td = soup.find('td', align="left")
-    return [a['href'] for a in pagination_td.find_all('a', href=True)] if pagination_td else []
+    page = await parsing_executor.run(extract_calendar_page, html, settings.PARSER_HTML_BACKEND)
+
+    if settings.PARSER_BACKEND_DIFF:
+        differences = await parsing_executor.run(diff_calendar_page, html, game_type, is_active)
+        for difference in differences:
+            parser_logger.warning(f"Бэкенды разбора календаря расходятся: {difference}")
+
+    return build_games_from_rows(page["rows"], game_type=game_type, is_active=is_active), page["pagination"]
 
 
 async def parse_game_data(html: str, game_type: str, is_active: bool = False) -> List[GameDate]:
@@ -95,73 +184,7 @@ async def parse_game_data(html: str, game_type: str, is_active: bool = False) ->
         :param is_active: True для Active-календаря (другая раскладка столбцов).
         :return: Список объектов GameDate.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    rows = soup.find_all("tr", id=lambda x: x and x.startswith("ctl20_ctl00_GamesRepeater"))
-
-    games = []
-    for row in rows:
-        cells = row.find_all("td")
-        row_data = [cell.get_text(strip=True) for cell in cells]
-
-        min_len = 10 if is_active else 8
-        if len(row_data) < min_len:
-            parser_logger.warning(
-                f"Skip row: not enough columns for {'active' if is_active else 'coming'} "
-                f"({len(row_data)} < {min_len}): {row_data}"
-            )
-            continue
-
-        if ".en.cx" in row_data[4] or ".encounter.cx" in row_data[4]:
-            parser_logger.warning(f"Skip row: invalid start_date='{row_data[4]}', row={row_data}")
-            continue
-
-        if is_active:
-            # Active: [0]flag [1]id [2]timer [3]domain [4]start [5]end [6]name [7]author [8]in_game [9]max_players(team)
-            end_date = None
-            try:
-                translated = translate_date(row_data[5])
-                end_date = datetime.strptime(translated, "%d %B %Y г. %H:%M:%S")
-            except (ValueError, IndexError):
-                parser_logger.warning(f"Не удалось распарсить end_date из календаря: '{row_data[5] if len(row_data) > 5 else 'N/A'}'")
-
-            max_players = None
-            if game_type == "team" and len(row_data) > 9:
-                max_players = extract_limit(row_data[9])
-
-            try:
-                game_date = GameDate(
-                    id=row_data[1].split('/')[1],
-                    domain=row_data[3].replace('.en.cx', '.encounter.cx'),
-                    start_date=row_data[4],
-                    end_date=end_date,
-                    name=row_data[6],
-                    author=re.sub(r'\s+', '', row_data[7]),
-                    price="0",
-                    game_type=game_type,
-                    max_players=max_players,
-                )
-            except Exception as e:
-                parser_logger.warning(f"Skip row: validation failed: {e}; row={row_data}")
-                continue
-        else:
-            # Coming: [0]flag [1]id [2]countdown [3]domain [4]start [5]name [6]author [7]price
-            try:
-                game_date = GameDate(
-                    id=row_data[1].split('/')[1],
-                    domain=row_data[3].replace('.en.cx', '.encounter.cx'),
-                    start_date=row_data[4],
-                    name=row_data[5],
-                    author=re.sub(r'\s+', '', row_data[6]),
-                    price=row_data[7],
-                    game_type=game_type
-                )
-            except Exception as e:
-                parser_logger.warning(f"Skip row: validation failed: {e}; row={row_data}")
-                continue
-
-        games.append(game_date)
-
-    parser_logger.info(f"Распарсено {len(games)} игр типа '{game_type}'.")
+    games, _ = await parse_calendar_page(html, game_type=game_type, is_active=is_active)
     return games
 
 
@@ -172,365 +195,343 @@ async def parse_additional_game_info(html: Optional[str]) -> AdditionalData:
     :param html: Текст HTML или None.
     :return: Объект AdditionalData.
     """
-    additional_data = AdditionalData()
-
     if not html:
-        return additional_data
-
-    soup = BeautifulSoup(html, "html.parser")
-
-    author_blocks = soup.find_all("span", id="lblFromAuthor")
-
-    image = None
+        return AdditionalData()
 
-    # for block in author_blocks:
-    #     next_tag = block.find_next()
-    #     while next_tag:
-    #         if next_tag.name == "img":
-    #             image = next_tag["src"]
-    #             break
-    #         next_tag = next_tag.find_next()
-    for img_tag in soup.find_all("img"):
-        if any("обложка" in img_tag.get(attr, "").lower() for attr in ["title", "alt"]):
-            image = img_tag["src"]
-            break
+    details = await parsing_executor.run(extract_game_details, html, settings.PARSER_HTML_BACKEND)
 
-    additional_data.image = image
+    if settings.PARSER_BACKEND_DIFF:
+        differences = await parsing_executor.run(diff_game_details, html)
+        for difference in differences:
+            parser_logger.warning(f"Бэкенды разбора страницы игры расходятся: {difference}")
 
-    span_max_players = soup.find('span', id='spanMaxTeamPlayers')
-    if span_max_players:
-        additional_data.max_players = span_max_players.get_text(strip=True)
+    return AdditionalData(**details)
 
-    end_date_td = soup.find_all('td', height="18")
-    for span in end_date_td:
-        if span and "Время окончания" in span.text:
-            span_end_date = span.find('span', class_='white')
-            if span_end_date:
-                additional_data.end_date = ' '.join(span_end_date.text.strip().split()[:2])
-                # print(f"Extracted end date text: {' '.join(span_end_date.text.strip().split()[:2])}")
-                break
 
-    return additional_data
-
-
-async def fetch_and_parse_games(session: aiohttp.ClientSession, url: str, game_type: str, is_active: bool = False) -> Tuple[List[GameDate], bool]:
+def apply_additional_data(game: GameDate, additional_data: AdditionalData) -> None:
     """
-        Собирает и парсит данные игр с учетом пагинации.
+    Дополняет игру данными с ее страницы: лимит игроков, дата окончания, обложка.
 
-        :param session: Объект aiohttp.ClientSession.
-        :param url: URL игры.
-        :param game_type: Тип игры (team или single).
-        :param is_active: True для Active-календаря.
-        :return: Список объектов GameDate и флаг ошибки загрузки.
+    :param game: Игра из календаря.
+    :param additional_data: Данные со страницы игры (пустой AdditionalData, если загрузить не удалось).
     """
-    fetch_failed = False
-    html, failed = await fetch_html(session, url)
-    if failed or not html:
-        parser_logger.warning(f"Не удалось загрузить страницу для URL: {url}")
-        return [], True
-
-    game_data = await parse_game_data(html, game_type=game_type, is_active=is_active)
-    pagination_links = extract_pagination_links(html)
-
-    for link in pagination_links:
-        page_html, page_failed = await fetch_html(session, link)
-        if page_failed or not page_html:
-            parser_logger.warning(f"Не удалось загрузить страницу пагинации для URL: {link}")
-            fetch_failed = True
-            continue
+    parsed_max = extract_limit(additional_data.max_players)
+    if parsed_max > 0 or game.max_players is None:
+        game.max_players = parsed_max
 
-        data = await parse_game_data(page_html, game_type=game_type, is_active=is_active)
-        game_data.extend(data)
+    if additional_data.end_date != EMPTY_FIELD:
+        game.update_end_date(additional_data.end_date)
 
-    return game_data, fetch_failed
+    game.image = additional_data.image
 
+    # Логируем игры, у которых не найдено изображение
+    if game.image is None:
+        parser_logger.warning(
+            f"Изображение не найдено на странице игры ID={game.id}. "
+            f"Будет использовано изображение по умолчанию. Ссылка: {game.link}"
+        )
 
-async def gather_additional_game_data(session: aiohttp.ClientSession, game_data: List[GameDate]) -> None:
+
+async def gather_additional_game_data(
+        session: aiohttp.ClientSession, game_data: List[GameDate], only_due: bool = False
+) -> List[GameDate]:
     """
     Собирает и добавляет дополнительные данные для каждой игры.
 
     :param session: Объект aiohttp.ClientSession.
     :param game_data: Список игр для обработки.
+    :param only_due: Качать только страницы игр, у которых подошел срок проверки (см. parser.deadlines);
+        для остальных берутся данные, разобранные при прошлой загрузке.
+    :return: Игры, для которых данные со страницы получены (загружены или взяты из кэша).
     """
-    tasks = [fetch_html(session, game.link or "") for game in game_data]
-    html_results = await asyncio.gather(*tasks)
+    cache = HttpCache()
+    now = moscow_now()
+
+    async def fetch_additional_data(url: str) -> Optional[AdditionalData]:
+        entry = await cache.load(url)
+        headers = {**DEFAULT_HEADERS, **cache.request_headers(entry)}
+        response, failed = await fetch_response(session, url, headers)
+        if failed or response is None:
+            return None
+
+        status, html, response_headers = response
+        if cache.is_unchanged(entry, status, html):
+            # Страница не изменилась с прошлого обхода — парсить заново не нужно
+            return AdditionalData(**entry["data"])
+
+        additional_data = await parse_additional_game_info(html)
+        await cache.save(url, html, response_headers, additional_data.model_dump())
+        return additional_data
 
-    tasks_for_additional_data = []
-    for game, fetch_result in zip(game_data, html_results):
-        html, failed = fetch_result
-        if failed or html is None:
+    results = {}
+    to_fetch = game_data
+    if only_due:
+        to_fetch, not_due = deadline_tracker.split(game_data, now)
+        for game in not_due:
+            entry = await cache.load(game.link or "")
+            if entry is None:
+                to_fetch.append(game)
+            else:
+                results[game.id] = AdditionalData(**entry["data"])
+
+    # Сначала качаем игры, которые стартуют раньше
+    scheduler = CrawlScheduler(rate=settings.PARSER_DETAILS_RATE, burst=max(1, int(settings.PARSER_DETAILS_RATE)))
+    fetched = await scheduler.run(
+        ((game.start_date.timestamp(), game.link or "") for game in to_fetch),
+        fetch=fetch_additional_data,
+        name="details",
+    )
+    cache.log_stats("details")
+    for game, additional_data in zip(to_fetch, fetched):
+        if additional_data is not None:
+            deadline_tracker.mark_checked(game.id, now)
+            results[game.id] = additional_data
+
+    for game in game_data:
+        additional_data = results.get(game.id)
+        if additional_data is None:
             parser_logger.warning(f"Не удалось загрузить HTML для игры ID={game.id}, ссылка: {game.link}")
-        tasks_for_additional_data.append(parse_additional_game_info(html))
-
-    additional_data_results = await asyncio.gather(*tasks_for_additional_data)
+            additional_data = AdditionalData()
+        apply_additional_data(game, additional_data)
 
-    for game, additional_data in zip(game_data, additional_data_results):
-        parsed_max = extract_limit(additional_data.max_players)
-        if parsed_max > 0 or game.max_players is None:
-            game.max_players = parsed_max
+    return [game for game in game_data if game.id in results]
 
-        if additional_data.end_date != EMPTY_FIELD:
-            game.update_end_date(additional_data.end_date)
 
-        game.image = additional_data.image
+async def crawl_games(only_due: bool = False) -> CrawlResult:
+    """
+        Загружает все календари (Coming и Active) и страницы игр — каждую не более одного раза за цикл.
+        Без записи в БД (см. run_parsing).
 
-        # Логируем игры, у которых не найдено изображение
-        if game.image is None:
-            parser_logger.warning(
-                f"Изображение не найдено на странице игры ID={game.id}. "
-                f"Будет использовано изображение по умолчанию. Ссылка: {game.link}"
-            )
+        :param only_due: Качать только страницы игр, у которых подошел срок проверки.
+        :return: Объект CrawlResult с играми по каждому календарю.
+    """
+    session = await http_client.start()
+    result = await CrawlPipeline(session, CALENDARS, only_due=only_due).run()
+    log_fetch_stats()
+    return result
 
 
 async def run_parsing() -> None:
     """
-        Главная функция для запуска процесса парсинга.
+        Главная функция для запуска процесса парсинга: потоковый обход календарей с записью
+        каждой игры по готовности (см. parser.pipeline), затем сверка состояний с БД.
+        Страницы игр качаются только для игр, у которых подошел срок проверки.
+
+        Если первые страницы календарей не изменились с прошлого обхода (см. parser.probe),
+        полный обход пропускается и обновляются только страницы игр с близкими сроками.
     """
-    max_connections = 150
-    connector = aiohttp.TCPConnector(limit=max_connections, ssl=False)
-    timeout = aiohttp.ClientTimeout(total=300)
-
-    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-        all_game_data = []
-        for url, game_type in GAMES_URLS:
-            game_data, _ = await fetch_and_parse_games(session, url, game_type)
-            all_game_data.extend(game_data)
-
-        await gather_additional_game_data(session, all_game_data)
-
-        parser_logger.info(f"Всего игр загружено: {len(all_game_data)}.")
-
-        # existing_games = await game_dao.get_all()
-        # existing_games = [game for game in existing_games if game.state != GameState.ACTIVE.value]
-        # existing_game_ids = {game.id for game in existing_games}
-        # parsed_game_ids = {game.id for game in all_game_data}
-        #
-        # games_to_delete = existing_game_ids - parsed_game_ids
-        # if len(games_to_delete) < 9:
-        #     for game_id in games_to_delete:
-        #         await game_dao.delete(id=game_id)
-        #         parser_logger.info(f"Удален объект: {game_id}")
-
-        await asyncio.sleep(10)
-        for game in all_game_data:
-            await game_dao.create(**game.model_dump())
-
-        parser_logger.info(f"Парсер завершил работу. Создано/обновлено записей: {len(all_game_data)}.")
-
-
-async def parsing_active_games() -> None:
-    active_games_from_db = {game.id for game in await game_dao.get_all(state=GameState.ACTIVE.value)}
-    upcoming_games_from_db = {game.id for game in await game_dao.get_all(state=GameState.UPCOMING.value)}
-
-    max_connections = 150
-    connector = aiohttp.TCPConnector(limit=max_connections, ssl=False)
-    timeout = aiohttp.ClientTimeout(total=300)
-
-    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-        active_game_data = []
-        active_fetch_failed = False
-        for url, game_type in ACTIVE_GAMES_URLS:
-            game_data, fetch_failed = await fetch_and_parse_games(session, url, game_type, is_active=True)
-            if fetch_failed:
-                parser_logger.info("Получен пустой результат для игры из ACTIVE_GAMES_URLS.")
-                active_fetch_failed = True
-                continue
-            active_game_data.extend(game_data)
-
-        if active_fetch_failed:
-            parser_logger.warning("Активные игры не обновлены: парсинг завершился с ошибками. Пропускаем изменения статусов.")
+    async with crawl_lock:
+        session = await http_client.start()
+        if not await change_probe.calendars_changed(session, CALENDARS):
+            parser_logger.info("Календари не изменились — пропускаем обход, обновляем только игры с близкими сроками.")
+            await _refresh_due_games()
+            change_probe.log_stats()
             return
 
-        await gather_additional_game_data(session, active_game_data)
-        active_games_id = {game.id for game in active_game_data}
-        if not active_games_id:
-            parser_logger.info(
-                f"Парсинг активных игр вернул 0 результатов. URL-список: {[u for u,_ in ACTIVE_GAMES_URLS]}"
-            )
-            return
+        pipeline = CrawlPipeline(
+            session, CALENDARS, dao=game_dao, only_due=True, first_pages=change_probe.take_pages()
+        )
+        result = await pipeline.run()
+        log_fetch_stats()
 
-        # Обновляем поля для игр, которые остаются активными
-        still_active_games = active_games_from_db & active_games_id
-        if still_active_games:
-            parser_logger.info(f"Обновляем поля для {len(still_active_games)} активных игр")
-            for game_id in still_active_games:
-                game = next((g for g in active_game_data if g.id == game_id), None)
-                if game:
-                    await game_dao.create(**game.model_dump())
-            parser_logger.info(f"Обновлено полей для {len(still_active_games)} активных игр")
-
-        new_active_games = active_games_id - active_games_from_db
-        if new_active_games:
-            parser_logger.info(f"Возвращаем в ACTIVE {len(new_active_games)} игр, которые были неактивны/архивированы")
-            async with game_dao.session_factory() as db_session:
-                for game_id in new_active_games:
-                    game = next((g for g in active_game_data if g.id == game_id), None)
-                    if not game:
-                        continue
-
-                    existing = await db_session.get(GameModel, game_id)
-
-                    current_image_path = existing.image if existing else None
-                    local_image = None
-                    if game.image and isinstance(game.image, str) and game.image.startswith(("http://", "https://")):
-                        local_image = await download_image(game_id=game.id, image_url=game.image)
-                    image_to_store = local_image if local_image is not None else current_image_path
-
-                    if existing:
-                        existing.name = game.name
-                        existing.start_date = game.start_date
-                        existing.end_date = game.end_date
-                        existing.image = image_to_store
-                        existing.image_url = game.image
-                        existing.state = GameState.ACTIVE.value
-                        db_session.add(existing)
-                    else:
-                        db_session.add(
-                            GameModel(
-                                id=game.id,
-                                domain=game.domain,
-                                start_date=game.start_date,
-                                end_date=game.end_date,
-                                name=game.name,
-                                author=game.author,
-                                price=game.price,
-                                link=game.link,
-                                game_type=game.game_type,
-                                max_players=game.max_players,
-                                image=image_to_store,
-                                image_url=game.image,
-                                state=GameState.ACTIVE.value,
-                                is_announcement_sent=False,
-                                is_start_message_sent=False,
-                            )
-                        )
+        snapshot = CrawlSnapshot(result)
+        diff = snapshot.diff(pipeline.stored_rows())
+        parser_logger.info(f"Сравнение обхода с БД: {diff.summary()}")
+        parser_logger.info(
+            f"Парсер завершил работу. Создано/обновлено записей: {pipeline.stats['written']} "
+            f"(новых: {pipeline.stats['new']}, без изменений: {pipeline.stats['unchanged']})."
+        )
+
+        await reconcile_active_games(result, snapshot, diff)
+        if not any(calendar.fetch_failed for calendar in result.calendars):
+            change_probe.commit()
+        deadline_tracker.log_stats()
+        change_probe.log_stats()
 
-                await db_session.commit()
 
-        games_to_complete = active_games_from_db - active_games_id
-        if len(games_to_complete) > 10:
-            parser_logger.warning(f"⚠️ Подозрительно много игр для COMPLETED: {len(games_to_complete)}. Проверьте парсер!")
-        if games_to_complete:
-            # Получаем информацию о каждой игре для детального логирования
-            games_details = await game_dao.get_all()
-            games_to_complete_details = {g.id: g for g in games_details if g.id in games_to_complete}
+async def refresh_due_games() -> None:
+    """
+        Легкое обновление между обходами календаря: перепроверяет страницы только тех живых игр,
+        у которых подошел срок (скорый старт или окончание), и записывает изменения.
+    """
+    if crawl_lock.locked():
+        parser_logger.info("Обход еще идет — пропускаем обновление страниц игр по срокам.")
+        return
+
+    async with crawl_lock:
+        await _refresh_due_games()
+
+
+async def _refresh_due_games() -> None:
+    """Тело refresh_due_games; вызывается под crawl_lock."""
+    rows = await game_dao.get_for_snapshot([], LIVE_STATES)
+    due_rows, _ = deadline_tracker.split(rows, moscow_now())
+    if not due_rows:
+        return
+
+    games = [
+        GameDate(
+            id=row.id, domain=row.domain, start_date=row.start_date, end_date=row.end_date, name=row.name,
+            author=row.author, price=row.price, game_type=row.game_type, max_players=row.max_players,
+            image=row.image_url,
+        )
+        for row in due_rows
+    ]
+    session = await http_client.start()
+    refreshed = await gather_additional_game_data(session, games)
+
+    diff = SnapshotDiff({row.id: row for row in due_rows})
+    for game in refreshed:
+        changes = CrawlSnapshot.field_changes(game, diff.stored[game.id])
+        if changes:
+            diff.changed[game.id] = changes
+            parser_logger.info(f"Игра ID={game.id} изменилась: {diff.format_changes(game.id)}")
+
+    changed_games = [game for game in refreshed if game.id in diff.changed]
+    if changed_games:
+        await game_dao.bulk_upsert(await prepare_game_rows(changed_games, diff))
+    parser_logger.info(
+        f"Обновление по срокам: проверено {len(refreshed)} из {len(due_rows)} игр, изменилось {len(changed_games)}."
+    )
+
+
+async def prepare_game_rows(games: List[GameDate], diff: SnapshotDiff) -> List[dict]:
+    """
+        Готовит строки game_dates для GameDateDAO.bulk_upsert, скачивая обложки до записи в БД.
 
-            parser_logger.info(f"Переводим в COMPLETED {len(games_to_complete)} игр (причина: не найдены в списке активных на сайте):")
-            for game_id in games_to_complete:
-                game = games_to_complete_details.get(game_id)
-                if game:
-                    parser_logger.info(f"  - ID={game_id}, ссылка: https://{game.domain}/GameDetails.aspx?gid={game_id}")
+        Обложки скачиваются параллельно и только для новых игр и игр, у которых сменился
+        URL обложки; для остальных bulk_upsert оставит уже сохраненный локальный файл.
 
+        :param games: Игры из обхода.
+        :param diff: Расхождения обхода с БД (нужны сохраненные image_url).
+        :return: Список словарей со столбцами game_dates.
+    """
+    images = await fetch_images({
+        game.id: game.image for game in games if needs_cover_download(game, diff.stored.get(game.id))
+    })
+    return [build_game_row(game, diff.stored.get(game.id), images.get(game.id)) for game in games]
+
+
+async def reconcile_active_games(result: CrawlResult, snapshot: CrawlSnapshot, diff: SnapshotDiff) -> None:
+    """
+        Переводит игры между UPCOMING/ACTIVE/COMPLETED/ARCHIVED по результату обхода.
+
+        :param result: Результат обхода.
+        :param snapshot: id игр обхода по календарям.
+        :param diff: Расхождения обхода с БД.
+    """
+    active_games_from_db = diff.stored_ids(GameState.ACTIVE)
+    upcoming_games_from_db = diff.stored_ids(GameState.UPCOMING)
+
+    # Возврат из архива зависит только от полностью загруженных Coming-календарей
+    games_to_restore = sorted(diff.transitions_to(GameState.UPCOMING))
+    if games_to_restore:
+        parser_logger.info(f"Возвращаем из архива {len(games_to_restore)} игр, снова найденных в календаре: {games_to_restore}")
+        await update_game_states(restore_ids=games_to_restore)
+
+    if result.active_fetch_failed:
+        parser_logger.warning("Активные игры не обновлены: парсинг завершился с ошибками. Пропускаем изменения статусов.")
+        return
+
+    active_games_id = snapshot.active_ids
+    if not active_games_id:
+        parser_logger.info(
+            f"Парсинг активных игр вернул 0 результатов. URL-список: {[u for u,_ in ACTIVE_GAMES_URLS]}"
+        )
+        return
+
+    # Поля и обложки уже записаны потоковым обходом, здесь меняется только состояние
+    new_active_games = diff.transitions_to(GameState.ACTIVE)
+    if new_active_games:
+        parser_logger.info(f"Возвращаем в ACTIVE {len(new_active_games)} игр, которые были неактивны/архивированы")
+        for game_id in new_active_games:
+            game = diff.stored.get(game_id)
+            old_state, _ = diff.transitions[game_id]
+            link = f"https://{game.domain}/GameDetails.aspx?gid={game_id}" if game is not None else "нет в БД"
+            parser_logger.info(f"Обновляем игру ID={game_id}, переводим в ACTIVE из {old_state}. Ссылка: {link}")
+
+        async with game_dao.session_factory() as db_session:
+            await db_session.execute(
+                update(GameModel)
+                .where(GameModel.id.in_(new_active_games))
+                .values(state=GameState.ACTIVE.value)
+            )
+            await db_session.commit()
+        game_dao.invalidate_cache(new_active_games)
+
+    games_to_complete = diff.transitions_to(GameState.COMPLETED)
+    if len(games_to_complete) > 10:
+        parser_logger.warning(f"⚠️ Подозрительно много игр для COMPLETED: {len(games_to_complete)}. Проверьте парсер!")
+    if games_to_complete:
+        parser_logger.info(f"Переводим в COMPLETED {len(games_to_complete)} игр (причина: не найдены в списке активных на сайте):")
+        for game_id in games_to_complete:
+            game = diff.stored[game_id]
+            parser_logger.info(f"  - ID={game_id}, ссылка: https://{game.domain}/GameDetails.aspx?gid={game_id}")
+
+        async with game_dao.session_factory() as db_session:
+            await db_session.execute(
+                update(GameModel)
+                .where(GameModel.id.in_(games_to_complete))
+                .values(state=GameState.COMPLETED.value)
+            )
+            parser_logger.info(f"Статусы успешно обновлены для {len(games_to_complete)} игр.")
+
+            await db_session.execute(
+                delete(UserGameSubscription).where(UserGameSubscription.game_id.in_(games_to_complete))
+            )
+            await db_session.execute(
+                delete(UserGameRole).where(UserGameRole.game_id.in_(games_to_complete))
+            )
+            await db_session.commit()
+        game_dao.invalidate_cache(games_to_complete)
+        deadline_tracker.forget(games_to_complete)
+        role_count_cache.invalidate(games_to_complete)
+    else:
+        parser_logger.info("Все активные игры актуальны, обновление не требуется.")
+
+    upcoming_games_id = snapshot.complete_upcoming_ids
+    if not upcoming_games_id:
+        parser_logger.info(f"Парсинг не прошел. Кол-во предстоящих игр: {len(upcoming_games_id)}")
+        return
+
+    missing_upcoming_games = upcoming_games_from_db - upcoming_games_id
+    if len(missing_upcoming_games) > 10:
+        parser_logger.warning(f"⚠️ Подозрительно много игр для ACTIVE: {len(missing_upcoming_games)}. Проверьте парсер!")
+
+    # Пропавшие из Coming игры, которые нашлись среди активных, уже переведены в ACTIVE выше
+    games_to_archive = sorted(diff.transitions_to(GameState.ARCHIVED))
+    if len(games_to_archive) <= 5:
+        for game_id in games_to_archive:
+            parser_logger.info(f"Архивируем игру {game_id}")
+        if games_to_archive:
             async with game_dao.session_factory() as db_session:
                 await db_session.execute(
                     update(GameModel)
-                    .where(GameModel.id.in_(games_to_complete))
-                    .values(state=GameState.COMPLETED.value)
-                )
-                parser_logger.info(f"Статусы успешно обновлены для {len(games_to_complete)} игр.")
-
-                await db_session.execute(
-                    delete(UserGameSubscription).where(UserGameSubscription.game_id.in_(games_to_complete))
-                )
-                await db_session.execute(
-                    delete(UserGameRole).where(UserGameRole.game_id.in_(games_to_complete))
+                    .where(GameModel.id.in_(games_to_archive))
+                    .values(state=GameState.ARCHIVED.value)
                 )
                 await db_session.commit()
-        else:
-            parser_logger.info("Все активные игры актуальны, обновление не требуется.")
-
-        upcoming_games_data = []
+            game_dao.invalidate_cache(games_to_archive)
+        parser_logger.info(f"{games_to_archive} заархивированны.")
 
-        for url, game_type in GAMES_URLS:
-            game_data, fetch_failed = await fetch_and_parse_games(session, url, game_type)
-            if fetch_failed:
-                parser_logger.info("Получен пустой результат для игры из GAMES_URLS. Откатываем изменения")
-                continue
-            upcoming_games_data.extend(game_data)
+    if not games_to_archive:
+        parser_logger.info("Все предстоящие игры актуальны, обновление не требуется.")
 
-        await gather_additional_game_data(session, upcoming_games_data)
+    parser_logger.info(
+        f"Итог обновления активных/предстоящих игр: active_from_db={len(active_games_from_db)}, "
+        f"active_parsed={len(active_games_id)}, completed={len(games_to_complete)}, "
+        f"archived={len(games_to_archive)}, upcoming_from_db={len(upcoming_games_from_db)}, "
+        f"upcoming_parsed={len(upcoming_games_id)}"
+    )
 
-        upcoming_games_id = {game.id for game in upcoming_games_data}
-        if not upcoming_games_id:
-            parser_logger.info(f"Парсинг не прошел. Кол-во предстоящих игр: {len(upcoming_games_id)}")
-            return
-        games_to_archive = []
-
-        missing_upcoming_games = upcoming_games_from_db - upcoming_games_id
-        if len(missing_upcoming_games) > 10:
-            parser_logger.warning(f"⚠️ Подозрительно много игр для ACTIVE: {len(missing_upcoming_games)}. Проверьте парсер!")
-        if missing_upcoming_games:
-            for game_id in missing_upcoming_games:
-                game = next((g for g in active_game_data if g.id == game_id), None)
-                if game:
-                    async with game_dao.session_factory() as db_session:
-                        existing = await db_session.get(GameModel, game_id)
-
-                        # Подготовка данных для логирования изменений
-                        changes = []
-                        if existing:
-                            if existing.name != game.name:
-                                changes.append(f"name: '{existing.name}' → '{game.name}'")
-                            if existing.start_date != game.start_date:
-                                changes.append(f"start_date: {existing.start_date} → {game.start_date}")
-                            if existing.end_date != game.end_date:
-                                changes.append(f"end_date: {existing.end_date} → {game.end_date}")
-                            if existing.state != GameState.ACTIVE.value:
-                                changes.append(f"state: {existing.state} → ACTIVE")
-
-                        current_image_path = existing.image if existing else None
-                        local_image = None
-                        if game.image and isinstance(game.image, str) and game.image.startswith(("http://", "https://")):
-                            local_image = await download_image(game_id=game.id, image_url=game.image)
-                        image_to_store = local_image if local_image is not None else current_image_path
-
-                        if existing and existing.image != image_to_store:
-                            changes.append(f"image: {existing.image} → {image_to_store}")
-
-                        parser_logger.info(
-                            f"Обновляем игру ID={game_id}, переводим в ACTIVE. "
-                            f"Изменения: {', '.join(changes) if changes else 'нет изменений'}. "
-                            f"Ссылка: https://{game.domain}/GameDetails.aspx?gid={game_id}"
-                        )
-
-                        await db_session.execute(
-                            update(GameModel)
-                            .where(GameModel.id == game_id)
-                            .values(name=game.name,
-                                    start_date=game.start_date,
-                                    end_date=game.end_date,
-                                    image=image_to_store,
-                                    image_url=game.image,
-                                    state=GameState.ACTIVE.value)
-                        )
-                        await db_session.commit()
-                        parser_logger.info(f"Игра ID={game_id} успешно обновлена")
-
-                else:
-                    games_to_archive.append(game_id)
-
-        if len(games_to_archive) <= 5:
-            for game_id in games_to_archive:
-                parser_logger.info(f"Архивируем игру {game_id}")
-                async with game_dao.session_factory() as db_session:
-                    await db_session.execute(
-                        update(GameModel)
-                        .where(GameModel.id == game_id)
-                        .values(state=GameState.ARCHIVED.value)
-                    )
-                    await db_session.commit()
-            parser_logger.info(f"{games_to_archive} заархивированны.")
-
-        if not games_to_archive:
-            parser_logger.info("Все предстоящие игры актуальны, обновление не требуется.")
 
-        parser_logger.info(
-            f"Итог обновления активных/предстоящих игр: active_from_db={len(active_games_from_db)}, "
-            f"active_parsed={len(active_games_id)}, completed={len(games_to_complete)}, "
-            f"archived={len(games_to_archive)}, upcoming_from_db={len(upcoming_games_from_db)}, "
-            f"upcoming_parsed={len(upcoming_games_id)}"
-        )
+async def _main() -> None:
+    try:
+        await run_parsing()
+    finally:
+        await http_client.close()
+        parsing_executor.shutdown()
 
 
 if __name__ == "__main__":
-    asyncio.run(run_parsing())
+    asyncio.run(_main())
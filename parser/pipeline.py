@@ -0,0 +1,391 @@
+"""
+Потоковый обход: календари → страницы игр → разбор → обложки → запись в БД.
+
+Стадии соединены ограниченными очередями asyncio.Queue. Если запись в БД или
+загрузка обложек не успевают, очереди заполняются и предыдущие стадии ждут
+(backpressure): в памяти одновременно находится не больше нескольких сотен игр и
+десятков страниц, а не весь обход. Каждая игра записывается, как только для нее
+готовы данные со страницы и обложка, небольшими пачками через GameDateDAO.bulk_upsert.
+"""
+import asyncio
+import math
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from db.models import GameState
+from logging_config import parser_logger
+from settings import settings
+from .crawler import TokenBucket, DEFAULT_LOG_INTERVAL, DEFAULT_WORKERS
+from .deadlines import deadline_tracker, moscow_now
+from .executor import parsing_executor
+from .http_cache import HttpCache
+from .images import IMAGE_CONCURRENCY, store_image
+from .schemas import AdditionalData, CalendarResult, CrawlResult, GameDate
+from .snapshot import CrawlSnapshot, LIVE_STATES, StoredGame, format_changes
+
+# Емкость очередей между стадиями
+DETAILS_QUEUE_SIZE = 200
+PARSE_QUEUE_SIZE = 50
+IMAGES_QUEUE_SIZE = 100
+WRITE_QUEUE_SIZE = 200
+# Больше игр за одну запись не собираем; если очередь опустела, пишем то, что есть
+WRITE_BATCH_SIZE = 100
+# Сколько страниц пагинации календаря качаем одновременно
+PAGINATION_CONCURRENCY = 4
+
+# Маркер конца очереди: каждый обработчик стадии получает свой
+_DONE = object()
+
+
+def needs_cover_download(game: GameDate, stored) -> bool:
+    """Обложку качаем только для новых игр и игр, у которых сменился URL обложки."""
+    return (
+        (stored is None or stored.image_url != game.image)
+        and bool(game.image) and game.image.startswith("http")
+    )
+
+
+def build_game_row(game: GameDate, stored, downloaded: Optional[str], state: GameState = GameState.UPCOMING) -> dict:
+    """
+    Строка game_dates для GameDateDAO.bulk_upsert.
+
+    :param game: Игра из обхода.
+    :param stored: Строка игры в БД или None для новой игры.
+    :param downloaded: Путь к скачанной обложке или None.
+    :param state: Состояние новой игры; у существующих bulk_upsert состояние не меняет.
+    :return: Словарь со столбцами game_dates.
+    """
+    row = game.model_dump()
+    image_url = row.pop("image")
+    row["image_url"] = image_url
+    row["image"] = stored.image if stored is not None else None
+    row["state"] = state.value
+
+    if stored is None or stored.image_url != image_url:
+        row["image"] = downloaded
+        if downloaded is None and needs_cover_download(game, stored):
+            parser_logger.info(f"❌ Изображение не было загружено, ставим None для : {game.id}")
+        elif stored is not None:
+            parser_logger.info(f"Изображение изменено для : {game.id}")
+            parser_logger.info(f"  Старый URL: {stored.image_url}")
+            parser_logger.info(f"  Новый URL: {image_url}")
+    return row
+
+
+class CrawlPipeline:
+    """
+    Один потоковый обход календарей.
+
+    :param session: HTTP-сессия (см. HttpClient.start).
+    :param calendars: (URL, тип игр, Active-календарь) для каждого календаря.
+    :param dao: GameDateDAO для записи; без него обход только собирает данные, обложки не качаются.
+    :param only_due: Качать только страницы игр, у которых подошел срок проверки (см. parser.deadlines);
+        для остальных берутся данные, разобранные при прошлой загрузке.
+    :param first_pages: URL календаря → HTML его первой страницы, уже загруженной в этом цикле
+        (см. ChangeProbe.take_pages); такие страницы повторно не качаются.
+    """
+
+    def __init__(self, session, calendars: List[Tuple[str, str, bool]], dao=None, only_due: bool = False,
+                 first_pages: Optional[Dict[str, str]] = None):
+        self.session = session
+        self.calendars = calendars
+        self.dao = dao
+        self.only_due = only_due
+        self.first_pages = first_pages or {}
+        self.now = moscow_now()
+        self.cache = HttpCache()
+        self.bucket = TokenBucket(settings.PARSER_DETAILS_RATE, max(1, int(settings.PARSER_DETAILS_RATE)))
+
+        # Как и в CrawlScheduler, раньше качаются страницы игр, которые раньше стартуют:
+        # элементы — (start_date.timestamp(), id, игра)
+        self.details_queue: asyncio.PriorityQueue = asyncio.PriorityQueue(DETAILS_QUEUE_SIZE)
+        self.parse_queue: asyncio.Queue = asyncio.Queue(PARSE_QUEUE_SIZE)
+        self.images_queue: asyncio.Queue = asyncio.Queue(IMAGES_QUEUE_SIZE)
+        self.write_queue: asyncio.Queue = asyncio.Queue(WRITE_QUEUE_SIZE)
+
+        # id игр обхода (одна игра может быть в нескольких календарях); сами игры живут только в очередях
+        self.seen: Set[int] = set()
+        self.active_ids: Set[int] = set()
+        # Строки БД до обхода: все живые игры и все игры, встреченные в календарях.
+        # Строка убирается, как только игра записана, — от нее остается только StoredGame
+        self.stored: Dict[int, Any] = {}
+        self.stored_games: Dict[int, StoredGame] = {}
+        # URL обложки → задача загрузки: одна обложка у нескольких игр качается один раз
+        self._covers: Dict[str, asyncio.Task] = {}
+        self.stats: Dict[str, int] = defaultdict(int)
+
+    async def run(self) -> CrawlResult:
+        """
+        Выполняет обход и возвращает календари; игры к этому моменту уже записаны в БД.
+
+        :return: Объект CrawlResult с id игр по каждому календарю.
+        """
+        started_at = time.monotonic()
+        if self.dao is not None:
+            for row in await self.dao.get_for_snapshot([], LIVE_STATES):
+                self.stored[row.id] = row
+
+        stages = [
+            (self.details_queue, [asyncio.create_task(self._details_worker()) for _ in range(DEFAULT_WORKERS)]),
+            (self.parse_queue, [asyncio.create_task(self._parse_worker()) for _ in range(parsing_executor.max_workers)]),
+            (self.images_queue, [asyncio.create_task(self._images_worker()) for _ in range(IMAGE_CONCURRENCY)]),
+            (self.write_queue, [asyncio.create_task(self._writer())]),
+        ]
+        reporter = asyncio.create_task(self._report(started_at))
+        try:
+            # Сначала Active-календари: к записи первой игры из Coming все активные id уже известны,
+            # и состояние новой игры не зависит от того, какой календарь успел загрузиться раньше
+            calendars = []
+            for active in (True, False):
+                calendars += await asyncio.gather(*(
+                    self._crawl_calendar(url, game_type, is_active)
+                    for url, game_type, is_active in self.calendars if is_active == active
+                ))
+            # Календари разобраны — закрываем стадии по порядку, дожидаясь, пока каждая доработает
+            for queue, workers in stages:
+                for index, _ in enumerate(workers):
+                    # В очереди с приоритетом маркер конца уходит после всех игр
+                    await queue.put((math.inf, index, _DONE) if queue is self.details_queue else _DONE)
+                await asyncio.gather(*workers)
+        finally:
+            reporter.cancel()
+            for _, workers in stages:
+                for worker in workers:
+                    worker.cancel()
+            for task in self._covers.values():
+                task.cancel()
+
+        self.cache.log_stats("details")
+        result = CrawlResult(calendars=list(calendars))
+        # Записи игр, которых нет ни в одном календаре, удаляем только если все календари загрузились целиком
+        self.cache.prune(drop_unused=not any(calendar.fetch_failed for calendar in result.calendars))
+        parser_logger.info(
+            f"Обход завершен за {time.monotonic() - started_at:.1f} с: предстоящих игр={len(result.upcoming_ids)}, "
+            f"активных={len(result.active_ids)}, уникальных страниц игр={len(self.seen)}; {self._format_stats()}"
+        )
+        return result
+
+    def stored_rows(self) -> Iterator:
+        """Состояния игр в БД до обхода для CrawlSnapshot.diff: записанные игры и все остальные живые."""
+        yield from self.stored_games.values()
+        yield from self.stored.values()
+
+    async def _crawl_calendar(self, url: str, game_type: str, is_active: bool) -> CalendarResult:
+        """Стадия 1: страницы календаря с пагинацией; игры уходят дальше сразу после разбора страницы."""
+        from .parser import fetch_html, parse_calendar_page
+
+        html = self.first_pages.pop(url, None)
+        if html is None:
+            html, failed = await fetch_html(self.session, url)
+        else:
+            self.stats["first_pages_reused"] += 1
+            failed = False
+        if failed or not html:
+            parser_logger.warning(f"Не удалось загрузить страницу для URL: {url}")
+            return CalendarResult(url=url, game_type=game_type, is_active=is_active, fetch_failed=True)
+
+        first_page, pagination_links = await parse_calendar_page(html, game_type=game_type, is_active=is_active)
+        game_ids = await self._emit(first_page, is_active)
+
+        semaphore = asyncio.Semaphore(PAGINATION_CONCURRENCY)
+
+        async def fetch_page(link: str) -> bool:
+            # Игры отдаются дальше под семафором: пока стадии ниже заняты, новые страницы не качаются
+            async with semaphore:
+                page_html, page_failed = await fetch_html(self.session, link)
+                if page_failed or not page_html:
+                    parser_logger.warning(f"Не удалось загрузить страницу пагинации для URL: {link}")
+                    return False
+                games, _ = await parse_calendar_page(page_html, game_type=game_type, is_active=is_active)
+                game_ids.update(await self._emit(games, is_active))
+                return True
+
+        loaded = await asyncio.gather(*(fetch_page(link) for link in pagination_links))
+        fetch_failed = not all(loaded)
+        if fetch_failed:
+            parser_logger.info(f"Календарь загружен с ошибками: {url}")
+        return CalendarResult(
+            url=url, game_type=game_type, is_active=is_active, game_ids=game_ids, fetch_failed=fetch_failed
+        )
+
+    async def _emit(self, games: List[GameDate], is_active: bool) -> Set[int]:
+        """Отдает новые игры страницы календаря на загрузку страниц игр; возвращает id игр страницы."""
+        self.stats["calendar_pages"] += 1
+        new_games = []
+        for game in games:
+            if game.id not in self.seen:
+                self.seen.add(game.id)
+                new_games.append(game)
+            if is_active:
+                self.active_ids.add(game.id)
+
+        if self.dao is not None:
+            unknown_ids = [game.id for game in new_games if game.id not in self.stored]
+            if unknown_ids:
+                for row in await self.dao.get_for_snapshot(unknown_ids, []):
+                    self.stored[row.id] = row
+
+        for game in new_games:
+            await self.details_queue.put((game.start_date.timestamp(), game.id, game))
+        return {game.id for game in games}
+
+    async def _details_worker(self) -> None:
+        """Стадия 2: загрузка страниц игр с ограничением частоты и условными запросами."""
+        while True:
+            _, _, game = await self.details_queue.get()
+            if game is _DONE:
+                return
+            try:
+                result = await self._fetch_details(game)
+            except Exception as e:
+                parser_logger.error(f"[pipeline] Ошибка при загрузке страницы игры ID={game.id}: {e}")
+                result = None
+
+            if isinstance(result, tuple):
+                await self.parse_queue.put((game, *result))
+            else:
+                await self._details_done(game, result)
+
+    async def _fetch_details(self, game: GameDate):
+        """
+        :return: AdditionalData из кэша, (HTML, заголовки) для разбора или None при ошибке.
+        """
+        from .parser import DEFAULT_HEADERS, fetch_response
+
+        url = game.link or ""
+        due = not self.only_due or deadline_tracker.take(game, self.now)
+        entry = await self.cache.load(url)
+        if not due and entry is not None:
+            self.stats["details_not_due"] += 1
+            return AdditionalData(**entry["data"])
+
+        await self.bucket.acquire()
+        headers = {**DEFAULT_HEADERS, **self.cache.request_headers(entry)}
+        response, failed = await fetch_response(self.session, url, headers)
+        if failed or response is None:
+            return None
+
+        self.stats["details_fetched"] += 1
+        deadline_tracker.mark_checked(game.id, self.now)
+        status, html, response_headers = response
+        if self.cache.is_unchanged(entry, status, html):
+            # Страница не изменилась с прошлого обхода — парсить заново не нужно
+            return AdditionalData(**entry["data"])
+        return html, response_headers
+
+    async def _parse_worker(self) -> None:
+        """Стадия 3: разбор страницы игры в пуле процессов."""
+        from .parser import parse_additional_game_info
+
+        while True:
+            item = await self.parse_queue.get()
+            if item is _DONE:
+                return
+            game, html, response_headers = item
+            try:
+                additional_data = await parse_additional_game_info(html)
+                await self.cache.save(game.link or "", html, response_headers, additional_data.model_dump())
+                self.stats["details_parsed"] += 1
+            except Exception as e:
+                parser_logger.error(f"[pipeline] Ошибка при разборе страницы игры ID={game.id}: {e}")
+                additional_data = None
+            item = html = None
+            await self._details_done(game, additional_data)
+
+    async def _details_done(self, game: GameDate, additional_data: Optional[AdditionalData]) -> None:
+        from .parser import apply_additional_data
+
+        if additional_data is None:
+            self.stats["details_failed"] += 1
+            parser_logger.warning(f"Не удалось загрузить HTML для игры ID={game.id}, ссылка: {game.link}")
+            additional_data = AdditionalData()
+        apply_additional_data(game, additional_data)
+        await self.images_queue.put(game)
+
+    async def _images_worker(self) -> None:
+        """Стадия 4: загрузка обложек новых игр и игр со сменившейся обложкой."""
+        while True:
+            game = await self.images_queue.get()
+            if game is _DONE:
+                return
+            image = None
+            if self.dao is not None and needs_cover_download(game, self.stored.get(game.id)):
+                try:
+                    image = await self._cover(game.image)
+                except Exception as e:
+                    parser_logger.error(f"[pipeline] Ошибка при загрузке обложки игры ID={game.id}: {e}")
+            await self.write_queue.put((game, image))
+
+    async def _cover(self, url: str) -> Optional[str]:
+        task = self._covers.get(url)
+        if task is None:
+            task = self._covers[url] = asyncio.create_task(store_image(url))
+            self.stats["covers"] += 1
+        return await asyncio.shield(task)
+
+    async def _writer(self) -> None:
+        """Стадия 5: запись готовых игр пачками; пачка уходит, как только очередь опустела."""
+        done = False
+        while not done:
+            batch = []
+            item = await self.write_queue.get()
+            while True:
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+                if len(batch) >= WRITE_BATCH_SIZE or self.write_queue.empty():
+                    break
+                item = self.write_queue.get_nowait()
+            if batch:
+                await self._write(batch)
+
+    async def _write(self, batch: List[Tuple[GameDate, Optional[str]]]) -> None:
+        if self.dao is None:
+            # Обход без записи (crawl_games, replay): обложки не качались, строки БД не нужны
+            self.stats["not_written"] += len(batch)
+            return
+        rows, written = [], {}
+        for game, image in batch:
+            stored = self.stored.pop(game.id, None)
+            self.stored_games[game.id] = StoredGame(game.id, stored.state if stored is not None else None, game.domain)
+            if stored is None:
+                self.stats["new"] += 1
+            else:
+                changes = CrawlSnapshot.field_changes(game, stored)
+                if not changes:
+                    self.stats["unchanged"] += 1
+                    continue
+                parser_logger.info(f"Игра ID={game.id} изменилась: {format_changes(changes)}")
+            # Все Active-календари к этому моменту разобраны (см. run), так что active_ids полный
+            state = GameState.ACTIVE if game.id in self.active_ids else GameState.UPCOMING
+            rows.append(build_game_row(game, stored, image, state))
+            if stored is None:
+                written[game.id] = StoredGame(game.id, state.value, game.domain)
+
+        if not rows:
+            return
+        try:
+            await self.dao.bulk_upsert(rows)
+            self.stats["written"] += len(rows)
+            # Новые игры вставлены сразу в нужном состоянии — сверке их переводить не нужно
+            self.stored_games.update(written)
+        except Exception as e:
+            # Не роняем обход: следующий цикл увидит те же расхождения и запишет их снова
+            self.stats["write_failed"] += len(rows)
+            parser_logger.error(f"[pipeline] Ошибка записи {len(rows)} игр: {e}")
+
+    def _format_stats(self) -> str:
+        return ", ".join(f"{name}={value}" for name, value in sorted(self.stats.items()))
+
+    async def _report(self, started_at: float) -> None:
+        while True:
+            await asyncio.sleep(DEFAULT_LOG_INTERVAL)
+            parser_logger.info(
+                f"[pipeline] {time.monotonic() - started_at:.0f} с: {self._format_stats()}; очереди: "
+                f"details={self.details_queue.qsize()}/{DETAILS_QUEUE_SIZE}, "
+                f"parse={self.parse_queue.qsize()}/{PARSE_QUEUE_SIZE}, "
+                f"images={self.images_queue.qsize()}/{IMAGES_QUEUE_SIZE}, "
+                f"write={self.write_queue.qsize()}/{WRITE_QUEUE_SIZE}"
+            )
@@ -0,0 +1,123 @@
+"""
+Дешевая проверка перед обходом: изменились ли календари с прошлого цикла.
+
+Качается только первая страница каждого календаря, из строк игр убираются столбцы,
+которые меняются сами по себе (обратный отсчет, таймер, число игроков в игре), и от
+остального считается хэш. Если хэши всех календарей совпали с прошлым полным обходом,
+цикл пропускается — обновляются только страницы игр с близким стартом/окончанием.
+"""
+import asyncio
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+from logging_config import parser_logger
+from settings import settings
+from .executor import parsing_executor
+from .extract import extract_calendar_page
+
+# Столбцы календаря, которые не влияют на данные игр и меняются без изменений на сайте:
+# Coming — [2] обратный отсчет; Active — [2] таймер и [8] сколько игроков уже в игре
+VOLATILE_COLUMNS = {
+    False: (2,),
+    True: (2, 8),
+}
+
+
+def normalize_row(row: List[str], is_active: bool) -> str:
+    """Строка календаря без изменчивых столбцов и с нормализованными пробелами."""
+    volatile = VOLATILE_COLUMNS[is_active]
+    return "\x1f".join(" ".join(cell.split()) for index, cell in enumerate(row) if index not in volatile)
+
+
+def calendar_fingerprint(page: dict, is_active: bool) -> str:
+    """
+    Хэш первой страницы календаря.
+
+    :param page: Результат extract_calendar_page.
+    :param is_active: True для Active-календаря.
+    :return: sha256 нормализованных строк и числа страниц пагинации.
+    """
+    digest = hashlib.sha256(f"pages={len(page['pagination'])}".encode("utf-8"))
+    for row in page["rows"]:
+        digest.update(b"\x1e" + normalize_row(row, is_active).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ChangeProbe:
+    """
+    Помнит хэши первых страниц календарей с последнего успешного полного обхода.
+
+    :param max_skips: Сколько циклов подряд можно пропустить; потом обход делается в любом
+        случае — изменения на дальних страницах пагинации проверка не видит.
+    """
+
+    def __init__(self, max_skips: int):
+        self.max_skips = max_skips
+        self.fingerprints: Dict[str, str] = {}
+        self._pending: Dict[str, str] = {}
+        # HTML первых страниц последней проверки: обход начинает с них, а не качает заново
+        self.pages: Dict[str, str] = {}
+        self.probes = 0
+        self.skipped_cycles = 0
+        self.consecutive_skips = 0
+        self.full_crawls = 0
+
+    async def _fingerprint(self, session, url: str, is_active: bool) -> Optional[str]:
+        from .parser import fetch_html
+
+        html, failed = await fetch_html(session, url)
+        if failed or not html:
+            parser_logger.warning(f"Проверка изменений: не удалось загрузить {url}")
+            return None
+        self.pages[url] = html
+        page = await parsing_executor.run(extract_calendar_page, html, settings.PARSER_HTML_BACKEND)
+        return calendar_fingerprint(page, is_active)
+
+    async def calendars_changed(self, session, calendars: List[Tuple[str, str, bool]]) -> bool:
+        """
+        Качает первые страницы календарей и сравнивает их с прошлым полным обходом.
+
+        :param session: HTTP-сессия.
+        :param calendars: (URL, тип игр, Active-календарь) для каждого календаря.
+        :return: True, если нужен полный обход.
+        """
+        self.probes += 1
+        self.pages = {}
+        fingerprints = await asyncio.gather(*(
+            self._fingerprint(session, url, is_active) for url, _, is_active in calendars
+        ))
+        self._pending = {url: fingerprint for (url, _, _), fingerprint in zip(calendars, fingerprints)}
+
+        changed = [url for url, fingerprint in self._pending.items()
+                   if fingerprint is None or self.fingerprints.get(url) != fingerprint]
+        if changed:
+            parser_logger.info(f"Проверка изменений: изменились календари {changed}")
+            return True
+        if self.consecutive_skips >= self.max_skips:
+            parser_logger.info(f"Проверка изменений: пропущено {self.consecutive_skips} циклов подряд — обходим полностью")
+            return True
+
+        self.skipped_cycles += 1
+        self.consecutive_skips += 1
+        self.pages = {}
+        return False
+
+    def take_pages(self) -> Dict[str, str]:
+        """Отдает загруженные проверкой первые страницы календарей (один раз за проверку)."""
+        pages, self.pages = self.pages, {}
+        return pages
+
+    def commit(self) -> None:
+        """Запоминает хэши последней проверки; вызывать после полного обхода без ошибок."""
+        self.fingerprints = {url: fingerprint for url, fingerprint in self._pending.items() if fingerprint}
+        self.consecutive_skips = 0
+        self.full_crawls += 1
+
+    def log_stats(self) -> None:
+        parser_logger.info(
+            f"Проверка изменений календарей: проверок={self.probes}, полных обходов={self.full_crawls}, "
+            f"пропущено циклов={self.skipped_cycles} (подряд {self.consecutive_skips})"
+        )
+
+
+change_probe = ChangeProbe(max_skips=settings.PARSER_PROBE_MAX_SKIPS)
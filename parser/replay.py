@@ -0,0 +1,273 @@
+"""
+Запись и воспроизведение HTTP-ответов парсера.
+
+В режиме record каждый ответ (URL, статус, заголовки, тело) сохраняется в сжатый
+корпус на диске; в режиме replay тот же обход обслуживается из корпуса без сети,
+при желании с искусственной задержкой и ошибками. Режим задается PARSER_HTTP_MODE
+(см. HttpClient.start).
+
+Запуск обхода без записи в БД с замером пропускной способности:
+    python -m parser.replay --mode replay --latency 0.2 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import random
+import time
+from typing import Optional
+from urllib.parse import urlparse, urlunparse
+
+import aiofiles
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from logging_config import parser_logger
+from .mirrors import MIRROR_SUFFIXES
+
+HTTP_CORPUS_DIR = "corpus/http"
+HTTP_MODES = ("live", "record", "replay")
+# Заголовки, которые не соответствуют уже распакованному телу
+SKIPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+CHUNK_SIZE = 64 * 1024
+
+
+def corpus_key(url: str) -> str:
+    """URL с хостом, приведенным к основному зеркалу, чтобы ответ зеркала находился по любому из них."""
+    parsed = urlparse(url)
+    host = parsed.netloc
+    for suffix in MIRROR_SUFFIXES:
+        if host.endswith(suffix):
+            host = host[:-len(suffix)] + MIRROR_SUFFIXES[0]
+            break
+    return urlunparse(parsed._replace(netloc=host))
+
+
+class HttpCorpus:
+    """
+    Корпус записанных ответов: по файлу <sha1(url)>.http.gz на URL.
+
+    Внутри gzip — строка JSON с URL, статусом и заголовками, перевод строки и сырое тело.
+    """
+
+    def __init__(self, corpus_dir: str = HTTP_CORPUS_DIR):
+        self.corpus_dir = corpus_dir
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0
+
+    def _path(self, url: str) -> str:
+        name = hashlib.sha1(corpus_key(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.corpus_dir, name + ".http.gz")
+
+    async def load(self, url: str) -> Optional[dict]:
+        path = self._path(url)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        async with aiofiles.open(path, "rb") as file:
+            meta, body = gzip.decompress(await file.read()).split(b"\n", 1)
+        self.hits += 1
+        entry = json.loads(meta)
+        entry["body"] = body
+        return entry
+
+    async def save(self, url: str, status: int, headers: dict, body: bytes) -> None:
+        os.makedirs(self.corpus_dir, exist_ok=True)
+        meta = {
+            "url": url,
+            "status": status,
+            "headers": [(key, value) for key, value in headers.items() if key.lower() not in SKIPPED_HEADERS],
+            "recorded_at": time.time(),
+        }
+        path = self._path(url)
+        tmp_path = path + ".tmp"
+        async with aiofiles.open(tmp_path, "wb") as file:
+            await file.write(gzip.compress(json.dumps(meta, ensure_ascii=False).encode("utf-8") + b"\n" + body))
+        os.replace(tmp_path, path)
+        self.saved += 1
+
+    def log_stats(self, mode: str) -> None:
+        parser_logger.info(
+            f"HTTP-корпус ({mode}, {self.corpus_dir}): записано={self.saved}, "
+            f"найдено={self.hits}, не найдено={self.misses}"
+        )
+
+
+class _Content:
+    def __init__(self, body: bytes):
+        self._body = body
+
+    async def iter_chunked(self, size: int):
+        for offset in range(0, len(self._body), size):
+            yield self._body[offset:offset + size]
+
+    async def read(self) -> bytes:
+        return self._body
+
+
+class CorpusResponse:
+    """Ответ из корпуса с тем подмножеством интерфейса aiohttp.ClientResponse, которым пользуется парсер."""
+
+    def __init__(self, url: str, status: int, headers, body: bytes):
+        self.url = URL(url)
+        self.status = status
+        self.headers = CIMultiDictProxy(CIMultiDict(headers))
+        self.content = _Content(body)
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: Optional[str] = None) -> str:
+        if encoding is None:
+            content_type = self.headers.get("Content-Type", "")
+            encoding = content_type.split("charset=")[-1].strip() if "charset=" in content_type else "utf-8"
+        return self._body.decode(encoding, errors="replace")
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            request_info = aiohttp.RequestInfo(self.url, "GET", CIMultiDictProxy(CIMultiDict()), self.url)
+            raise aiohttp.ClientResponseError(request_info, (), status=self.status, message="Replay error")
+
+
+class _ResponseContext:
+    def __init__(self, coro):
+        self._coro = coro
+
+    async def __aenter__(self) -> CorpusResponse:
+        return await self._coro
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+
+class ReplayProfile:
+    """
+    Профиль воспроизведения: задержка каждого ответа и доля искусственных ошибок.
+
+    :param latency: Средняя задержка ответа в секундах.
+    :param jitter: Разброс задержки как доля от latency (равномерно ±jitter).
+    :param error_rate: Доля запросов, завершающихся ошибкой (таймаут, обрыв соединения или 503).
+    :param seed: Зерно генератора, чтобы прогоны были воспроизводимыми.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.5, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+
+
+class RecordingSession:
+    """Обертка над aiohttp.ClientSession, сохраняющая каждый ответ в корпус."""
+
+    def __init__(self, session: aiohttp.ClientSession, corpus: HttpCorpus):
+        self._session = session
+        self.corpus = corpus
+
+    @property
+    def closed(self) -> bool:
+        return self._session.closed
+
+    def get(self, url: str, **kwargs) -> _ResponseContext:
+        return _ResponseContext(self._get(url, **kwargs))
+
+    async def _get(self, url: str, **kwargs) -> CorpusResponse:
+        async with self._session.get(url, **kwargs) as response:
+            body = await response.read()
+            await self.corpus.save(url, response.status, dict(response.headers), body)
+            return CorpusResponse(url, response.status, response.headers, body)
+
+    async def close(self) -> None:
+        self.corpus.log_stats("record")
+        await self._session.close()
+
+
+class ReplaySession:
+    """Сессия без сети: отвечает из корпуса, URL вне корпуса получает 404."""
+
+    def __init__(self, corpus: HttpCorpus, profile: Optional[ReplayProfile] = None):
+        self.corpus = corpus
+        self.profile = profile or ReplayProfile()
+        self.injected_errors = 0
+        self._random = random.Random(self.profile.seed)
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def get(self, url: str, **kwargs) -> _ResponseContext:
+        return _ResponseContext(self._get(url))
+
+    async def _get(self, url: str) -> CorpusResponse:
+        profile = self.profile
+        if profile.latency > 0:
+            spread = profile.latency * profile.jitter
+            await asyncio.sleep(max(0.0, profile.latency + self._random.uniform(-spread, spread)))
+
+        if profile.error_rate > 0 and self._random.random() < profile.error_rate:
+            self.injected_errors += 1
+            error = self._random.choice(("timeout", "connection", "status"))
+            if error == "timeout":
+                raise asyncio.TimeoutError(f"Replay: искусственный таймаут для {url}")
+            if error == "connection":
+                raise aiohttp.ClientConnectionError(f"Replay: искусственный обрыв соединения для {url}")
+            return CorpusResponse(url, 503, {}, b"")
+
+        entry = await self.corpus.load(url)
+        if entry is None:
+            parser_logger.warning(f"Replay: нет ответа в корпусе для {url}")
+            return CorpusResponse(url, 404, {}, b"")
+        return CorpusResponse(url, entry["status"], entry["headers"], entry["body"])
+
+    async def close(self) -> None:
+        self.corpus.log_stats("replay")
+        if self.injected_errors:
+            parser_logger.info(f"Replay: искусственных ошибок={self.injected_errors}")
+        self._closed = True
+
+
+async def _crawl(args) -> None:
+    from loader import http_client
+    from .executor import parsing_executor
+    from .parser import crawl_games
+
+    http_client.mode = args.mode
+    http_client.corpus_dir = args.corpus
+    http_client.replay_profile = ReplayProfile(args.latency, args.jitter, args.error_rate, args.seed)
+    started_at = time.monotonic()
+    try:
+        result = await crawl_games()
+    finally:
+        await http_client.close()
+        parsing_executor.shutdown()
+    elapsed = time.monotonic() - started_at
+
+    games = len(result.upcoming_ids) + len(result.active_ids)
+    print(json.dumps({
+        "mode": args.mode,
+        "elapsed_sec": round(elapsed, 3),
+        "games": games,
+        "games_per_sec": round(games / elapsed, 2) if elapsed else None,
+        "failed_calendars": [calendar.url for calendar in result.calendars if calendar.fetch_failed],
+    }, ensure_ascii=False))
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Обход календарей в режиме записи/воспроизведения без записи в БД")
+    arg_parser.add_argument("--mode", choices=HTTP_MODES, default="replay")
+    arg_parser.add_argument("--corpus", default=HTTP_CORPUS_DIR)
+    arg_parser.add_argument("--latency", type=float, default=0.0)
+    arg_parser.add_argument("--jitter", type=float, default=0.5)
+    arg_parser.add_argument("--error-rate", type=float, default=0.0)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(_crawl(arg_parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 from pydantic import BaseModel, field_validator, model_validator
-from typing import Optional
+from typing import List, Optional, Set
 from datetime import datetime
 
+from .dates import parse_calendar_date, parse_details_date
+
 EMPTY_FIELD = "Нет информации"
 
 MONTHS_MAP = {
@@ -21,7 +23,7 @@ MONTHS_MAP = {
 
 
 def translate_date(date_str: str) -> str:
-    """Переводит русские месяцы в английские для парсинга."""
+    """Переводит русские месяцы в английские для парсинга (старый путь; см. parser.dates)."""
     for ru_month, en_month in MONTHS_MAP.items():
         date_str = date_str.replace(ru_month, en_month)
     return date_str
@@ -45,8 +47,7 @@ class GameDate(BaseModel):
         """Валидатор для start_date."""
         if isinstance(value, str):
             try:
-                translated_date = translate_date(value)
-                return datetime.strptime(translated_date, "%d %B %Y г. %H:%M:%S")
+                return parse_calendar_date(value)
                 # return datetime.strptime(value, "%A, %B %d, %Y %I:%M:%S %p")
             except ValueError:
                 # print(f"Invalid start_date format: {value}")
@@ -69,7 +70,7 @@ class GameDate(BaseModel):
             self.end_date = None
         else:
             try:
-                self.end_date = datetime.strptime(value, "%d.%m.%Y %H:%M:%S")
+                self.end_date = parse_details_date(value)
             except ValueError as e:
                 from logging_config import parser_logger
                 parser_logger.error(
@@ -98,3 +99,43 @@ class AdditionalData(BaseModel):
     end_date: str = EMPTY_FIELD
     max_players: str = EMPTY_FIELD
     image: Optional[str] = None
+
+
+class CalendarResult(BaseModel):
+    url: str
+    game_type: str
+    is_active: bool = False
+    # Только id: сами игры записываются по ходу обхода и в результате не хранятся
+    game_ids: Set[int] = set()
+    fetch_failed: bool = False
+
+
+class CrawlResult(BaseModel):
+    """Результат одного обхода: id игр по каждому календарю."""
+    calendars: List[CalendarResult] = []
+
+    def _ids(self, is_active: bool, skip_failed: bool = False) -> Set[int]:
+        return {
+            game_id
+            for calendar in self.calendars
+            if calendar.is_active == is_active and not (skip_failed and calendar.fetch_failed)
+            for game_id in calendar.game_ids
+        }
+
+    @property
+    def upcoming_ids(self) -> Set[int]:
+        """Игры всех Coming-календарей, включая частично загруженные."""
+        return self._ids(is_active=False)
+
+    @property
+    def complete_upcoming_ids(self) -> Set[int]:
+        """Игры только из Coming-календарей, загруженных без ошибок."""
+        return self._ids(is_active=False, skip_failed=True)
+
+    @property
+    def active_ids(self) -> Set[int]:
+        return self._ids(is_active=True)
+
+    @property
+    def active_fetch_failed(self) -> bool:
+        return any(calendar.fetch_failed for calendar in self.calendars if calendar.is_active)
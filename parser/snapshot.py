@@ -0,0 +1,112 @@
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Set, Tuple
+
+from db.models import GameState
+from .schemas import CrawlResult, GameDate
+
+# Поля GameDate, которые сравниваются с одноименными столбцами game_dates
+DIFF_FIELDS = ("name", "start_date", "end_date", "author", "price", "domain", "link", "game_type", "max_players")
+# image в парсере — это URL обложки; в БД он хранится в image_url
+IMAGE_FIELD = ("image", "image_url")
+
+LIVE_STATES = (GameState.UPCOMING.value, GameState.ACTIVE.value)
+
+
+def format_changes(changes: Dict[str, Tuple[Any, Any]]) -> str:
+    return ", ".join(f"{field}: {old!r} → {new!r}" for field, (old, new) in changes.items())
+
+
+class StoredGame(NamedTuple):
+    """Что остается от строки БД после записи игры обходом: для сверки состояний нужны только они."""
+    id: int
+    state: Optional[int]
+    domain: str
+
+
+class SnapshotDiff:
+    """
+    Расхождения между снимком обхода и БД.
+
+    changed — id → {поле: (в БД, на сайте)} (заполняет точечное обновление, см. refresh_due_games);
+    disappeared — живые (UPCOMING/ACTIVE) игры из БД, которых нет ни в одном календаре;
+    transitions — id → (состояние в БД или None, новое состояние).
+    """
+
+    def __init__(self, stored: Dict[int, Any]):
+        self.stored = stored
+        self.changed: Dict[int, Dict[str, Tuple[Any, Any]]] = {}
+        self.disappeared: Dict[int, Any] = {}
+        self.transitions: Dict[int, Tuple[Optional[int], int]] = {}
+
+    def stored_ids(self, state: GameState) -> Set[int]:
+        return {game_id for game_id, row in self.stored.items() if row.state == state.value}
+
+    def transitions_to(self, state: GameState) -> Set[int]:
+        return {game_id for game_id, (_, new_state) in self.transitions.items() if new_state == state.value}
+
+    def format_changes(self, game_id: int) -> str:
+        return format_changes(self.changed.get(game_id, {}))
+
+    def summary(self) -> str:
+        return (
+            f"исчезло={len(self.disappeared)}, "
+            f"→ACTIVE={len(self.transitions_to(GameState.ACTIVE))}, "
+            f"→COMPLETED={len(self.transitions_to(GameState.COMPLETED))}, "
+            f"→ARCHIVED={len(self.transitions_to(GameState.ARCHIVED))}, "
+            f"→UPCOMING={len(self.transitions_to(GameState.UPCOMING))}"
+        )
+
+
+class CrawlSnapshot:
+    """Снимок обхода: только id игр по календарям, сами игры к этому моменту уже записаны."""
+
+    def __init__(self, result: CrawlResult):
+        self.active_ids: Set[int] = result.active_ids
+        self.upcoming_ids: Set[int] = result.upcoming_ids
+        # Архивировать можно только по календарям, загруженным без ошибок
+        self.complete_upcoming_ids: Set[int] = result.complete_upcoming_ids
+
+    @property
+    def ids(self) -> Set[int]:
+        return self.upcoming_ids | self.active_ids
+
+    @staticmethod
+    def field_changes(game: GameDate, row) -> Dict[str, Tuple[Any, Any]]:
+        changes = {}
+        for field in DIFF_FIELDS:
+            old, new = getattr(row, field), getattr(game, field)
+            if old != new:
+                changes[field] = (old, new)
+        parsed_field, stored_field = IMAGE_FIELD
+        if getattr(row, stored_field) != getattr(game, parsed_field):
+            changes[parsed_field] = (getattr(row, stored_field), getattr(game, parsed_field))
+        return changes
+
+    def diff(self, rows: Iterable) -> SnapshotDiff:
+        """
+        Сравнивает снимок с текущими строками БД за один проход.
+
+        :param rows: Строки game_dates (или StoredGame): все игры снимка и все живые игры.
+        :return: Объект SnapshotDiff.
+        """
+        result = SnapshotDiff({row.id: row for row in rows})
+        ids = self.ids
+
+        for game_id in self.active_ids:
+            row = result.stored.get(game_id)
+            if row is None or row.state != GameState.ACTIVE.value:
+                result.transitions[game_id] = (row.state if row else None, GameState.ACTIVE.value)
+
+        for game_id, row in result.stored.items():
+            if row.state in LIVE_STATES and game_id not in ids:
+                result.disappeared[game_id] = row
+            if row.state == GameState.ACTIVE.value and game_id not in self.active_ids:
+                result.transitions[game_id] = (row.state, GameState.COMPLETED.value)
+            elif (row.state == GameState.UPCOMING.value
+                  and game_id not in self.complete_upcoming_ids and game_id not in self.active_ids):
+                result.transitions[game_id] = (row.state, GameState.ARCHIVED.value)
+            elif (row.state == GameState.ARCHIVED.value
+                  and game_id in self.complete_upcoming_ids and game_id not in self.active_ids):
+                # Архивная игра снова в Coming (например, после сбоя календаря)
+                result.transitions[game_id] = (row.state, GameState.UPCOMING.value)
+
+        return result
@@ -0,0 +1,187 @@
+"""
+Локальный стенд encounter.cx для нагрузочных прогонов парсера.
+
+Имитирует GameCalendar.aspx (Coming/Active, Team/Single, пагинация в td[align=left])
+и GameDetails.aspx (spanMaxTeamPlayers, обложка с alt "обложка", ячейка
+"Время окончания") на синтетических играх. Запуск:
+
+    python -m parser.standin --games 20000 --active 500 --port 8080
+
+Чтобы парсер ходил на стенд, задайте PARSER_SITE_URL=http://127.0.0.1:8080: все
+запросы к зеркалам encounter (календари и страницы игр) перенаправятся на него.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+from datetime import datetime, timedelta
+from html import escape
+from typing import Dict, List
+
+from aiohttp import web
+
+from .backends import GAMES_ROW_ID_PREFIX
+
+MONTHS_GENITIVE = (
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря",
+)
+DOMAINS = ("kovrov.encounter.cx", "moscow.en.cx", "spb.en.cx", "quest.encounter.cx", "vladimir.en.cx")
+DEFAULT_PAGE_SIZE = 50
+# Сколько разных обложек на все игры: одинаковые картинки проверяют дедупликацию
+COVER_VARIANTS = 50
+FIRST_GAME_ID = 70000
+
+
+def format_calendar_date(value: datetime) -> str:
+    """Дата в формате календаря encounter: '17 октября 2026 г. 19:00:00'."""
+    return f"{value.day} {MONTHS_GENITIVE[value.month - 1]} {value.year} г. {value:%H:%M:%S}"
+
+
+class SyntheticGame:
+    def __init__(self, game_id: int, rng: random.Random, now: datetime, is_active: bool):
+        self.id = game_id
+        self.game_type = rng.choice(("team", "single"))
+        self.domain = rng.choice(DOMAINS)
+        self.name = f"Игра №{game_id}"
+        self.author = rng.choice(("Автор", "Команда", "Организаторы")) + str(rng.randint(1, 300))
+        self.price = rng.choice(("0", "100", "300", "500"))
+        self.max_players = rng.randint(2, 12) if self.game_type == "team" else 1
+        self.cover = rng.randrange(COVER_VARIANTS)
+        self.is_active = is_active
+        if is_active:
+            self.start_date = now - timedelta(hours=rng.randint(1, 24 * 14))
+            self.end_date = now + timedelta(hours=rng.randint(1, 24 * 30))
+        else:
+            self.start_date = now + timedelta(hours=rng.randint(1, 24 * 120))
+            self.end_date = self.start_date + timedelta(hours=rng.randint(2, 24 * 7))
+        self.start_date = self.start_date.replace(minute=0, second=0, microsecond=0)
+        self.end_date = self.end_date.replace(minute=0, second=0, microsecond=0)
+
+
+class StandinSite:
+    """Синтетический набор игр и обработчики страниц."""
+
+    def __init__(self, games: int, active: int, page_size: int = DEFAULT_PAGE_SIZE, seed: int = 0,
+                 latency: float = 0.0):
+        rng = random.Random(seed)
+        now = datetime.now()
+        self.page_size = page_size
+        self.latency = latency
+        self.games: Dict[int, SyntheticGame] = {}
+        for index in range(games + active):
+            game_id = FIRST_GAME_ID + index
+            self.games[game_id] = SyntheticGame(game_id, rng, now, is_active=index >= games)
+        self.coming = sorted((g for g in self.games.values() if not g.is_active), key=lambda g: g.start_date)
+        self.active = sorted((g for g in self.games.values() if g.is_active), key=lambda g: g.end_date)
+
+    def _calendar_games(self, status: str, game_type: str) -> List[SyntheticGame]:
+        games = self.active if status == "active" else self.coming
+        return [game for game in games if game.game_type == game_type]
+
+    @staticmethod
+    def _coming_cells(number: int, game: SyntheticGame) -> List[str]:
+        return [
+            "", f"{number}/{game.id}", "через несколько дней", game.domain,
+            format_calendar_date(game.start_date), escape(game.name), escape(game.author), game.price,
+        ]
+
+    @staticmethod
+    def _active_cells(number: int, game: SyntheticGame) -> List[str]:
+        return [
+            "", f"{number}/{game.id}", "идет", game.domain,
+            format_calendar_date(game.start_date), format_calendar_date(game.end_date),
+            escape(game.name), escape(game.author), str(game.max_players // 2),
+            f"Ограничение: {game.max_players}" if game.game_type == "team" else "",
+        ]
+
+    def render_calendar(self, request: web.Request) -> str:
+        status = request.query.get("status", "Coming").lower()
+        game_type = "single" if request.query.get("type", "Team").lower() == "single" else "team"
+        page = max(1, int(request.query.get("page", "1")))
+
+        games = self._calendar_games(status, game_type)
+        pages = max(1, -(-len(games) // self.page_size))
+        offset = (page - 1) * self.page_size
+        cells = self._active_cells if status == "active" else self._coming_cells
+
+        rows = []
+        for index, game in enumerate(games[offset:offset + self.page_size]):
+            row_cells = "".join(f"<td>{cell}</td>" for cell in cells(offset + index + 1, game))
+            rows.append(f'<tr id="{GAMES_ROW_ID_PREFIX}_ctl{index:02d}_row">{row_cells}</tr>')
+
+        links = "".join(
+            f'<a href="{escape(str(request.url.update_query(page=str(number))))}">{number}</a> '
+            for number in range(1, pages + 1) if number != page
+        )
+        return (
+            "<html><head><meta charset='utf-8'><title>Календарь игр</title></head><body>"
+            "<table><tr><td>Меню</td></tr></table>"
+            f"<table>{''.join(rows)}</table>"
+            f"<table><tr><td align=\"left\">{links}</td></tr></table>"
+            "</body></html>"
+        )
+
+    def render_details(self, request: web.Request, game: SyntheticGame) -> str:
+        cover = f"{request.scheme}://{request.host}/images/cover{game.cover}.jpg"
+        return (
+            "<html><head><meta charset='utf-8'><title>Игра</title></head><body>"
+            f"<h1>{escape(game.name)}</h1>"
+            f'<img src="{cover}" alt="Обложка игры" title="Обложка">'
+            "<table>"
+            f'<tr><td height="18">Время начала: <span class="white">{game.start_date:%d.%m.%Y %H:%M:%S} (UTC+3)</span></td></tr>'
+            f'<tr><td height="18">Время окончания: <span class="white">{game.end_date:%d.%m.%Y %H:%M:%S} (UTC+3)</span></td></tr>'
+            "</table>"
+            f'<p>Максимум игроков в команде: <span id="spanMaxTeamPlayers">{game.max_players}</span></p>'
+            "</body></html>"
+        )
+
+    async def _respond(self, request: web.Request, text: str) -> web.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        etag = '"' + hashlib.sha1(text.encode("utf-8")).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=text, content_type="text/html", charset="utf-8", headers={"ETag": etag})
+
+    async def calendar(self, request: web.Request) -> web.Response:
+        return await self._respond(request, self.render_calendar(request))
+
+    async def details(self, request: web.Request) -> web.Response:
+        game = self.games.get(int(request.query.get("gid", "0") or 0))
+        if game is None:
+            raise web.HTTPNotFound()
+        return await self._respond(request, self.render_details(request, game))
+
+    async def cover(self, request: web.Request) -> web.Response:
+        variant = request.match_info["variant"]
+        # Не настоящий JPEG, но парсеру и загрузчику обложек важны только байты
+        body = hashlib.sha256(variant.encode()).digest() * 512
+        return web.Response(body=body, content_type="image/jpeg")
+
+    def app(self) -> web.Application:
+        application = web.Application()
+        application.router.add_get("/GameCalendar.aspx", self.calendar)
+        application.router.add_get("/GameDetails.aspx", self.details)
+        application.router.add_get("/images/cover{variant}.jpg", self.cover)
+        return application
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Локальный стенд encounter.cx с синтетическими играми")
+    arg_parser.add_argument("--games", type=int, default=5000, help="предстоящих игр")
+    arg_parser.add_argument("--active", type=int, default=200, help="активных игр")
+    arg_parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="задержка каждого ответа, с")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8080)
+    args = arg_parser.parse_args()
+
+    site = StandinSite(args.games, args.active, args.page_size, args.seed, args.latency)
+    print(f"Стенд: {len(site.coming)} предстоящих, {len(site.active)} активных игр на http://{args.host}:{args.port}")
+    web.run_app(site.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,29 @@ class Settings(BaseSettings):
     BOT_TOKEN: str
     CHATS_ID: str
     TELEGRAM_API_BASE: str = "http://185.233.80.76:8080/tgapi"
+    # Бэкенд разбора HTML парсером: "lxml" или "html.parser"
+    PARSER_HTML_BACKEND: str = "html.parser"
+    # Дополнительно разбирать каждую страницу вторым бэкендом и логировать расхождения
+    PARSER_BACKEND_DIFF: bool = False
+    # Хеджирование запросов по зеркалам: повтор на следующее зеркало, если ответа нет дольше перцентиля задержки
+    PARSER_HEDGING: bool = False
+    PARSER_HEDGE_PERCENTILE: float = 0.95
+    PARSER_HEDGE_BUDGET: float = 0.1
+    # HTTP парсера: "live", "record" (писать ответы в корпус) или "replay" (отвечать из корпуса без сети)
+    PARSER_HTTP_MODE: str = "live"
+    PARSER_HTTP_CORPUS: str = "corpus/http"
+    # Профиль replay: средняя задержка ответа в секундах и доля искусственных ошибок
+    PARSER_REPLAY_LATENCY: float = 0.0
+    PARSER_REPLAY_ERROR_RATE: float = 0.0
+    # Базовый URL, на который перенаправляются все запросы к encounter (локальный стенд parser.standin)
+    PARSER_SITE_URL: str = ""
+    # Ограничение скорости загрузки страниц игр, запросов в секунду (для стенда можно поднять)
+    PARSER_DETAILS_RATE: float = 15.0
+    # Как часто (в минутах) обходить календарь и как часто перепроверять страницы игр с близким стартом/окончанием
+    PARSER_CALENDAR_INTERVAL: int = 30
+    PARSER_REFRESH_TICK: int = 5
+    # Сколько циклов подряд можно пропустить, если первые страницы календарей не изменились (0 — не пропускать)
+    PARSER_PROBE_MAX_SKIPS: int = 5
 
     @property
     def get_database_url(self):